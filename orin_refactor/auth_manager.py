@@ -1,10 +1,10 @@
 import os
-import aiohttp
 import ssl
 import logging
 from datetime import datetime, timezone
 from typing import Optional
 from socket_types import MessageKeys
+from http_client import http_client
 import dotenv
 dotenv.load_dotenv()
 
@@ -49,26 +49,25 @@ class AuthManager:
         if self.jwt_token and self.jwt_expiry and datetime.now(timezone.utc) < self.jwt_expiry:
             return self.jwt_token
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    self.auth_server_url,
-                    json={MessageKeys.DEVICE_ID: self.device_id, "device_secret": self.device_secret},
-                    ssl=self.ssl_context
-                ) as response:
-                    if response.status == 200:
-                        auth_data = await response.json()
-                        self.jwt_token = auth_data['token']
-                        self.jwt_expiry = datetime.fromtimestamp(auth_data['expiry'], tz=timezone.utc)
-                        self.stream_key = auth_data['stream_key']
-                        self.logger.info("Successfully obtained new JWT token")
-                        return self.jwt_token
-                    else:
-                        self.logger.error(f"Failed to authenticate device: {response.status}")
-                        raise Exception(f"Authentication failed with status {response.status}")
-            except Exception as e:
-                self.logger.error(f"Error during authentication: {e}")
-                raise
+        try:
+            async with http_client.post(
+                self.auth_server_url,
+                json={MessageKeys.DEVICE_ID: self.device_id, "device_secret": self.device_secret},
+                ssl=self.ssl_context
+            ) as response:
+                if response.status == 200:
+                    auth_data = await response.json()
+                    self.jwt_token = auth_data['token']
+                    self.jwt_expiry = datetime.fromtimestamp(auth_data['expiry'], tz=timezone.utc)
+                    self.stream_key = auth_data['stream_key']
+                    self.logger.info("Successfully obtained new JWT token")
+                    return self.jwt_token
+                else:
+                    self.logger.error(f"Failed to authenticate device: {response.status}")
+                    raise Exception(f"Authentication failed with status {response.status}")
+        except Exception as e:
+            self.logger.error(f"Error during authentication: {e}")
+            raise
 
     def get_ssl_context(self) -> ssl.SSLContext:
         return self.ssl_context
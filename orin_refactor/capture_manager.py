@@ -1,11 +1,89 @@
 import asyncio
+import threading
+import time
 import cv2
 import numpy as np
-from typing import Tuple, Optional, AsyncGenerator
+from typing import Tuple, Optional, AsyncGenerator, List
 from config_manager import ConfigManager
-from socket_types import PayloadKeys
+from socket_types import PayloadKeys, ConfigKeys
+from replay_source import ReplaySource, ReplayPacing
+from frame import Frame
 import logging
 
+class FrameRing:
+    '''
+    Fixed pool of reusable frame buffers shared between the capture thread and the consumer.
+    The newest published frame always wins, frames the consumer never picked up are counted as dropped.
+    With blocking set the writer instead waits in wait_taken() until the previous frame was taken,
+    so replays deliver every frame. A frame returned by take() stays valid until the next call to take().
+    '''
+    def __init__(self, size: int = 3, blocking: bool = False):
+        self.size = max(int(size), 3)
+        self.blocking = blocking
+        self.buffers: List[Optional[np.ndarray]] = [None] * self.size
+        self.capture_times: List[float] = [0.0] * self.size
+        self.wall_times: List[float] = [0.0] * self.size
+        self.read_times: List[float] = [0.0] * self.size
+        self.lock = threading.Lock()
+        self.taken = threading.Condition(self.lock)
+        self.latest: int = -1
+        self.reading: int = -1
+        self.next_slot: int = 0
+        self.published_seq: int = 0
+        self.taken_seq: int = 0
+
+    def acquire_write_slot(self) -> int:
+        with self.lock:
+            for _ in range(self.size):
+                slot = self.next_slot
+                self.next_slot = (self.next_slot + 1) % self.size
+                if slot != self.latest and slot != self.reading:
+                    return slot
+        raise RuntimeError("No free frame buffer available")
+
+    def wait_taken(self, stop: threading.Event) -> bool:
+        '''
+        Block until the consumer has taken the last published frame, returns False when stop is set first.
+        '''
+        with self.taken:
+            while self.published_seq != self.taken_seq:
+                if stop.is_set():
+                    return False
+                self.taken.wait(0.1)
+        return not stop.is_set()
+
+    def publish(self, slot: int, frame: np.ndarray, capture_time: float, wall_time: float, read_time: float) -> int:
+        with self.lock:
+            self.buffers[slot] = frame
+            self.capture_times[slot] = capture_time
+            self.wall_times[slot] = wall_time
+            self.read_times[slot] = read_time
+            self.latest = slot
+            self.published_seq += 1
+            return self.published_seq
+
+    def take(self, source_id: str = "") -> Optional[Frame]:
+        '''
+        Return the newest frame, dropped holds how many frames were skipped since the last take.
+        '''
+        with self.lock:
+            if self.latest < 0 or self.published_seq == self.taken_seq:
+                return None
+            slot = self.reading = self.latest
+            dropped = self.published_seq - self.taken_seq - 1
+            self.taken_seq = self.published_seq
+            self.taken.notify_all()
+            return Frame(self.buffers[slot], self.taken_seq, self.capture_times[slot], self.wall_times[slot], source_id, dropped,
+                         self.read_times[slot])
+
+    def reset(self):
+        with self.lock:
+            self.latest = -1
+            self.reading = -1
+            self.published_seq = 0
+            self.taken_seq = 0
+            self.taken.notify_all()
+
 class CaptureManager:
     def __init__(self, config_manager: ConfigManager):
         self.logger = logging.getLogger(__name__)
@@ -16,42 +94,244 @@ class CaptureManager:
         self.fps: int = 30
         self.source: str = "/dev/video0"
         self.stop_capture_event = asyncio.Event()
+        self.threaded_capture: bool = False
+        self.capture_buffers: int = 3
+        self.ring: Optional[FrameRing] = None
+        self.capture_thread: Optional[threading.Thread] = None
+        self.capture_thread_stop = threading.Event()
+        self.capture_thread_done: Optional[threading.Event] = None
+        self.cap_lock = threading.Lock()
+        self.restart_lock = asyncio.Lock()
+        self.pending_read: Optional[asyncio.Future] = None
+        self.frame_ready = asyncio.Event()
+        self.frame_seq: int = 0
+        self.dropped_frames: int = 0
+        self.max_read_failures: int = 30
+        self.replay_pacing: str = ReplayPacing.REALTIME
+        self.replay_fps: Optional[float] = None
+        self.replay_loop: bool = False
+        self.replay_epoch: float = 0.0
 
-    async def initialize(self):
-        self.source = self.config_manager.get(PayloadKeys.SOURCE, self.source)
+    async def initialize(self, source: Optional[str] = None, replay_pacing: Optional[str] = None):
+        self.source = source or self.config_manager.get(PayloadKeys.SOURCE, self.source)
         self.resolution = tuple(self.config_manager.get(PayloadKeys.RESOLUTION, self.resolution))
         self.fps = self.config_manager.get(PayloadKeys.FPS, self.fps)
+        self.threaded_capture = bool(self.config_manager.get(ConfigKeys.threaded_capture, self.threaded_capture))
+        self.capture_buffers = int(self.config_manager.get(ConfigKeys.capture_buffers, self.capture_buffers))
+        self.replay_pacing = replay_pacing or self.config_manager.get(ConfigKeys.replay_pacing, self.replay_pacing)
+        self.replay_fps = self.config_manager.get(ConfigKeys.replay_fps, self.replay_fps)
+        self.replay_loop = bool(self.config_manager.get(ConfigKeys.replay_loop, self.replay_loop))
+        self.replay_epoch = float(self.config_manager.get(ConfigKeys.replay_epoch, self.replay_epoch) or 0)
         await self.get_cap()
 
     async def get_cap(self):
         if self.cap is not None:
             await self.stop_capture()
         try:
+            if ReplaySource.is_replay(self.source):
+                self.cap = ReplaySource.open(self.source, self.resolution, self.replay_fps, self.replay_pacing, self.replay_loop)
+                return
             self.cap = cv2.VideoCapture(self.source)
             self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('M', 'J', 'P', 'G'))
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+            if self.threaded_capture:
+                self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         except Exception as e:
             raise Exception(f"Could not initialize Video Capture: {e}")
 
-    async def get_frame_generator(self) -> AsyncGenerator[np.ndarray, None]:
-        while not self.stop_capture_event.is_set():
+    def _timestamps(self, cap) -> Tuple[float, float]:
+        '''
+        capture_time and wall_time for the frame just read. Replays stamp both from the position in the
+        recording, wall_time offset by replay_epoch, so a replay gives the same timestamps on every run.
+        Live sources use the clock.
+        '''
+        if isinstance(cap, ReplaySource):
+            return cap.timestamp, self.replay_epoch + cap.timestamp
+        return time.monotonic(), time.time()
+
+    def now(self) -> float:
+        '''
+        Current time on the clock frames are stamped with, the replay position while replaying.
+        '''
+        cap = self.cap
+        if isinstance(cap, ReplaySource):
+            return self.replay_epoch + cap.timestamp
+        return time.time()
+
+    async def get_frame_generator(self) -> AsyncGenerator[Frame, None]:
+        async with self.restart_lock:
+            pass
+        if self.threaded_capture:
+            async for frame in self._threaded_frame_generator():
+                yield frame
+            return
+        cap = self.cap
+        while not self.stop_capture_event.is_set() and cap is not None and self.cap is cap:
             try:
                 async with self.frame_lock:
-                    ret, frame = await asyncio.get_event_loop().run_in_executor(None, self.cap.read)
+                    self.pending_read = asyncio.get_event_loop().run_in_executor(None, cap.read)
+                    ret, frame = await self.pending_read
                     if not ret:
+                        if self.is_exhausted():
+                            break
                         continue
-                    yield frame
+                    self.frame_seq += 1
+                    yield Frame(frame, self.frame_seq, *self._timestamps(cap), str(self.source), read_time=time.monotonic())
             except Exception as e:
                 self.logger.error(f"Error getting frame: {e}")
                 break
 
+    async def _threaded_frame_generator(self) -> AsyncGenerator[Frame, None]:
+        '''
+        Yield the freshest frame decoded by the capture thread. Frames that arrive while the
+        consumer is busy are overwritten and counted in dropped_frames, except for replays at max
+        pacing, where the capture thread waits for the consumer so every frame is delivered.
+        '''
+        if self.cap is None:
+            return
+        self.start_capture_thread()
+        ring, stop = self.ring, self.capture_thread_stop
+        while not self.stop_capture_event.is_set():
+            frame = ring.take(str(self.source))
+            if frame is None:
+                if stop.is_set():
+                    break
+                await self.frame_ready.wait()
+                self.frame_ready.clear()
+                continue
+            self.frame_seq = frame.seq
+            self.dropped_frames += frame.dropped
+            yield frame
+
+    def is_replay(self) -> bool:
+        return isinstance(self.cap, ReplaySource)
+
+    def is_exhausted(self) -> bool:
+        '''
+        True once a replay source has run out of frames, live cameras never exhaust.
+        Never true while a restart is swapping the source.
+        '''
+        if self.restart_lock.locked():
+            return False
+        return self.is_replay() and self.cap.finished
+
+    def get_latest_frame(self) -> Optional[Frame]:
+        '''
+        Non-blocking access to the newest frame, frame.dropped counts the frames skipped before it.
+        '''
+        if self.ring is None:
+            return None
+        frame = self.ring.take(str(self.source))
+        if frame is None:
+            return None
+        self.frame_seq = frame.seq
+        self.dropped_frames += frame.dropped
+        return frame
+
+    def start_capture_thread(self):
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            return
+        if self.ring is None:
+            self.ring = FrameRing(self.capture_buffers)
+        self.ring.blocking = self.is_replay() and self.cap.pacing == ReplayPacing.MAX
+        self.ring.reset()
+        self.frame_ready.clear()
+        self.capture_thread_stop = threading.Event()
+        self.capture_thread_done = threading.Event()
+        loop = asyncio.get_running_loop()
+        self.capture_thread = threading.Thread(
+            target=self._capture_loop,
+            args=(loop, self.cap, self.ring, self.capture_thread_stop, self.capture_thread_done),
+            name="capture",
+            daemon=True,
+        )
+        self.capture_thread.start()
+        self.logger.info(f"Started capture thread with {self.ring.size} frame buffers")
+
+    def _capture_loop(self, loop: asyncio.AbstractEventLoop, cap, ring: FrameRing, stop: threading.Event, done: threading.Event):
+        '''
+        Reads into the ring it was started with until stop is set. cap, ring and the events belong to this
+        thread, so a thread that outlives a restart never touches the new capture. If stop_capture() gave
+        up waiting for it, the thread releases cap itself once its last read returns.
+        '''
+        failures = 0
+        try:
+            while not stop.is_set() and cap is not None:
+                slot = ring.acquire_write_slot()
+                ret, frame = cap.read(ring.buffers[slot])
+                if not ret or frame is None:
+                    if isinstance(cap, ReplaySource) and cap.finished:
+                        break
+                    failures += 1
+                    if failures >= self.max_read_failures:
+                        self.logger.error(f"Capture thread stopping after {failures} failed reads")
+                        break
+                    stop.wait(0.01)
+                    continue
+                failures = 0
+                if ring.blocking and not ring.wait_taken(stop):
+                    break
+                ring.publish(slot, frame, *self._timestamps(cap), time.monotonic())
+                loop.call_soon_threadsafe(self.frame_ready.set)
+        except Exception as e:
+            self.logger.error(f"Error in capture thread: {e}")
+        finally:
+            stop.set()
+            with self.cap_lock:
+                done.set()
+                orphaned = cap is not None and cap is not self.cap
+            if orphaned:
+                cap.release()
+            try:
+                loop.call_soon_threadsafe(self.frame_ready.set)
+            except RuntimeError:
+                pass
+
+    async def stop_capture_thread(self):
+        if self.capture_thread is None:
+            return
+        self.capture_thread_stop.set()
+        self.frame_ready.set()
+        await asyncio.get_running_loop().run_in_executor(None, self.capture_thread.join, 2)
+        if self.capture_thread.is_alive():
+            self.logger.warning("Capture thread still blocked in a read, it will release the source when it returns")
+        self.capture_thread = None
+
     async def stop_capture(self):
+        '''
+        Stop reading and release the source. A capture is never released while another thread may still
+        read it: a pending inline read is awaited, and a capture thread that is still blocked releases
+        the source itself when its read returns.
+        '''
         self.stop_capture_event.set()
-        if self.cap is not None:
-            self.cap.release
-            self.cap = None
+        await self.stop_capture_thread()
+        if self.pending_read is not None:
+            try:
+                await asyncio.shield(self.pending_read)
+            except Exception:
+                pass
+            self.pending_read = None
+        with self.cap_lock:
+            cap, self.cap = self.cap, None
+            thread_owned = self.capture_thread_done is not None and not self.capture_thread_done.is_set()
+            self.capture_thread_done = None
+        if cap is not None and not thread_owned:
+            cap.release()
+
+    async def restart(self):
+        '''
+        Reopen the source with the current configuration. The running frame generator ends and the
+        tracking loop picks the new capture up on its next pass; generators entered meanwhile wait
+        until the new capture and ring exist.
+        '''
+        async with self.restart_lock:
+            await self.stop_capture()
+            self.stop_capture_event.clear()
+            self.ring = None
+            await self.initialize()
+        self.logger.info(f"Restarted capture on {self.source} at {self.resolution}")
 
     async def cleanup(self):
         await self.stop_capture()
-        self.stop_capture_event.clear()
\ No newline at end of file
+        self.stop_capture_event.clear()
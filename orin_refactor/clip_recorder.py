@@ -0,0 +1,166 @@
+import os
+import time
+import logging
+import threading
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+class Clip:
+    __slots__ = ('start', 'end', 'limit', 'reason', 'frames')
+
+    def __init__(self, start: float, end: float, limit: float, reason: str, frames: List[Tuple[float, bytes]]):
+        self.start = start
+        self.end = end
+        self.limit = limit
+        self.reason = reason
+        self.frames = frames
+
+class ClipRecorder:
+    '''
+    Keeps the last pre_seconds of video as JPEG frames in a ring bounded by time and bytes, and on a
+    trigger writes a clip from pre_seconds before to post_seconds after the event. Triggers during an
+    open clip extend it up to max_seconds. Frames are sampled at fps and JPEG encoded on one worker
+    thread, clips are assembled on another, so neither touches the event loop or the SD card until
+    something happens.
+    '''
+    def __init__(self, save_dir: str = "output", pre_seconds: float = 10, post_seconds: float = 10, fps: float = 5,
+                 quality: int = 70, width: int = 640, max_bytes: int = 64 * 1024 * 1024, max_seconds: float = 120,
+                 codec: str = "mp4v"):
+        self.logger = logging.getLogger("app")
+        self.save_dir = os.path.join(save_dir, "clips")
+        self.pre_seconds = float(pre_seconds)
+        self.post_seconds = float(post_seconds)
+        self.interval = 1 / max(float(fps), 0.1)
+        self.quality = min(max(int(quality), 1), 100)
+        self.width = int(width)
+        self.max_bytes = int(max_bytes)
+        self.max_seconds = max(float(max_seconds), self.pre_seconds + self.post_seconds)
+        self.codec = codec
+        self.ring: Deque[Tuple[float, bytes]] = deque()
+        self.ring_bytes = 0
+        self.clip: Optional[Clip] = None
+        self.lock = threading.Lock()
+        self.encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-encoder")
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="clip-writer")
+        self.encoding = False
+        self.closed = False
+        self.next_frame_time = 0.0
+        self.skipped = 0
+        self.saved = 0
+        self.last_clip: Optional[str] = None
+
+    def add(self, image: np.ndarray, timestamp: float):
+        '''
+        Sample a frame into the ring. Returns right away, frames arriving while the encoder is busy are skipped.
+        '''
+        if self.closed or timestamp < self.next_frame_time:
+            return
+        if self.encoding:
+            self.skipped += 1
+            return
+        self.next_frame_time = max(self.next_frame_time + self.interval, timestamp)
+        height, width = image.shape[:2]
+        if 0 < self.width < width:
+            image = cv2.resize(image, (self.width, round(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        else:
+            image = image.copy()
+        self.encoding = True
+        try:
+            self.encoder.submit(self._encode, image, timestamp)
+        except RuntimeError:
+            self.encoding = False
+
+    def _encode(self, image: np.ndarray, timestamp: float):
+        try:
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                return
+            self._append(timestamp, buffer.tobytes())
+        except Exception as e:
+            self.logger.error(f"Error encoding clip frame: {e}")
+        finally:
+            self.encoding = False
+
+    def _append(self, timestamp: float, jpeg: bytes):
+        with self.lock:
+            self.ring.append((timestamp, jpeg))
+            self.ring_bytes += len(jpeg)
+            while self.ring and (self.ring[0][0] < timestamp - self.pre_seconds or self.ring_bytes > self.max_bytes):
+                self.ring_bytes -= len(self.ring.popleft()[1])
+            clip = self.clip
+            if clip is None:
+                return
+            if timestamp <= clip.end:
+                clip.frames.append((timestamp, jpeg))
+                return
+            self.clip = None
+        self.writer.submit(self._write, clip)
+
+    def trigger(self, timestamp: float, reason: str):
+        '''
+        Start a clip around the event at timestamp, or extend the open one.
+        '''
+        with self.lock:
+            if self.closed:
+                return
+            if self.clip is not None:
+                self.clip.end = min(max(self.clip.end, timestamp + self.post_seconds), self.clip.limit)
+                return
+            start = timestamp - self.pre_seconds
+            frames = [frame for frame in self.ring if frame[0] >= start]
+            self.clip = Clip(start, timestamp + self.post_seconds, start + self.max_seconds, reason, frames)
+        self.logger.info(f"Recording clip for {reason} event")
+
+    def _write(self, clip: Clip):
+        if len(clip.frames) < 2:
+            return
+        os.makedirs(self.save_dir, exist_ok=True)
+        name = datetime.fromtimestamp(clip.frames[0][0], tz=timezone.utc).strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.save_dir, f"{name}_{clip.reason}.mp4")
+        duration = clip.frames[-1][0] - clip.frames[0][0]
+        fps = (len(clip.frames) - 1) / duration if duration > 0 else 1 / self.interval
+        start = time.perf_counter()
+        writer = None
+        try:
+            for _, jpeg in clip.frames:
+                image = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if writer is None:
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), fps, (image.shape[1], image.shape[0]))
+                    if not writer.isOpened():
+                        raise RuntimeError(f"Cannot open video writer for {path}")
+                writer.write(image)
+        except Exception as e:
+            self.logger.error(f"Error writing clip {path}: {e}")
+            return
+        finally:
+            if writer is not None:
+                writer.release()
+        self.saved += 1
+        self.last_clip = path
+        self.logger.info(f"Saved {duration:.1f}s clip {path} in {time.perf_counter() - start:.2f}s")
+
+    def close(self):
+        '''
+        Write the open clip with the frames it has and release the worker threads once they finish.
+        '''
+        self.closed = True
+        self.encoder.shutdown(wait=True)
+        with self.lock:
+            clip, self.clip = self.clip, None
+        if clip is not None:
+            self.writer.submit(self._write, clip)
+        self.writer.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "buffered_frames": len(self.ring),
+            "buffered_bytes": self.ring_bytes,
+            "recording": self.clip is not None,
+            "skipped": self.skipped,
+            "saved": self.saved,
+            "last_clip": self.last_clip,
+        }
@@ -49,6 +49,12 @@ class ConfigManager:
         self.config['available_weights'] = weights
         self.logger.info(f"Available weights {weights}")
         
+    def diff(self, new_config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the entries of new_config whose values differ from the current configuration.
+        """
+        return {key: value for key, value in new_config.items() if key not in self.config or self.config[key] != value}
+
     async def update(self, new_config: Dict[str, Any]):
         """
         Update the configuration with new values and save to file.
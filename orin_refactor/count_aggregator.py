@@ -0,0 +1,127 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+class BucketSeries:
+    '''
+    Per-class counts in fixed, epoch-aligned time buckets. The open bucket accumulates counts, closed
+    buckets go into a ring of capacity rows (start time + one count column per class) until drained.
+    '''
+    def __init__(self, seconds: float, capacity: int):
+        self.seconds = float(seconds)
+        self.capacity = int(capacity)
+        self.starts = np.zeros(self.capacity, dtype=np.float64)
+        self.counts = np.zeros((self.capacity, 0), dtype=np.int32)
+        self.current = np.zeros(0, dtype=np.int32)
+        self.start: Optional[float] = None
+        self.head = 0
+        self.pending = 0
+        self.overwritten = 0
+
+    def _grow(self, classes: int):
+        if classes <= len(self.current):
+            return
+        self.current = np.pad(self.current, (0, classes - len(self.current)))
+        self.counts = np.pad(self.counts, ((0, 0), (0, classes - self.counts.shape[1])))
+
+    def advance(self, timestamp: float) -> Optional[np.ndarray]:
+        '''
+        Close the open bucket once timestamp is past its end, returns the closed counts or None.
+        '''
+        start = timestamp - timestamp % self.seconds
+        if self.start is None:
+            self.start = start
+            return None
+        if start <= self.start:
+            return None
+        closed = self.current.copy()
+        self.push(self.start, closed)
+        self.current[:] = 0
+        self.start = start
+        return closed
+
+    def push(self, start: float, counts: np.ndarray):
+        self._grow(len(counts))
+        self.starts[self.head] = start
+        self.counts[self.head] = 0
+        self.counts[self.head, :len(counts)] = counts
+        self.head = (self.head + 1) % self.capacity
+        if self.pending == self.capacity:
+            self.overwritten += 1
+        self.pending = min(self.pending + 1, self.capacity)
+
+    def add(self, counts: np.ndarray):
+        self._grow(len(counts))
+        self.current[:len(counts)] += counts.astype(np.int32)
+
+    def drain(self) -> List[int]:
+        '''
+        Ring rows of the pending buckets, oldest first, and mark them as sent.
+        '''
+        rows = [(self.head - self.pending + i) % self.capacity for i in range(self.pending)]
+        self.pending = 0
+        return rows
+
+class CountAggregator:
+    '''
+    Rolls class counts into per-minute buckets and those into hourly buckets on the device, so
+    counts can be shipped a bucket at a time instead of once per event. Empty minute buckets are
+    skipped when draining, hourly buckets are always reported.
+    '''
+    def __init__(self, bucket_seconds: float = 60, rollup_seconds: float = 3600, capacity: int = 1440):
+        self.configure(bucket_seconds, rollup_seconds, capacity)
+
+    def configure(self, bucket_seconds: float = 60, rollup_seconds: float = 3600, capacity: int = 1440):
+        bucket_seconds, rollup_seconds = float(bucket_seconds), float(rollup_seconds)
+        if getattr(self, "buckets", None) is not None and (bucket_seconds, rollup_seconds) == (self.buckets.seconds, self.rollups.seconds):
+            return
+        self.buckets = BucketSeries(bucket_seconds, capacity)
+        rollup_seconds = max(rollup_seconds, bucket_seconds)
+        self.rollups = BucketSeries(rollup_seconds, max(int(capacity * bucket_seconds // rollup_seconds), 24))
+
+    def advance(self, timestamp: float):
+        start = self.buckets.start
+        closed = self.buckets.advance(timestamp)
+        if closed is not None:
+            self.rollups.advance(start)
+            self.rollups.add(closed)
+        self.rollups.advance(timestamp)
+
+    def add(self, timestamp: float, classes: np.ndarray):
+        self.advance(timestamp)
+        if len(classes):
+            self.buckets.add(np.bincount(np.asarray(classes, dtype=np.int64)))
+
+    @staticmethod
+    def _format(series: BucketSeries, rows: List[int], names: Dict[int, str], skip_empty: bool) -> List[Dict[str, Any]]:
+        buckets = []
+        for row in rows:
+            counts = series.counts[row]
+            if skip_empty and not counts.any():
+                continue
+            buckets.append({
+                "start": datetime.fromtimestamp(series.starts[row], timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                "seconds": series.seconds,
+                "counts": {names.get(cls, str(cls)): int(counts[cls]) for cls in np.flatnonzero(counts).tolist()},
+            })
+        return buckets
+
+    def drain(self, timestamp: float, names: Optional[Dict[int, str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        '''
+        Close the buckets that ended before timestamp and return every bucket not yet drained.
+        '''
+        names = names or {}
+        self.advance(timestamp)
+        return {
+            "minutes": self._format(self.buckets, self.buckets.drain(), names, True),
+            "hours": self._format(self.rollups, self.rollups.drain(), names, False),
+        }
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "pending_buckets": self.buckets.pending,
+            "pending_rollups": self.rollups.pending,
+            "overwritten": self.buckets.overwritten + self.rollups.overwritten,
+        }
+
+count_aggregator = CountAggregator()
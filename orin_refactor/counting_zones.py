@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+DIRECTIONS = ("in", "out")
+
+class ZoneType:
+    LINE = "line"
+    POLYGON = "polygon"
+
+class CountingZones:
+    '''
+    Direction-aware crossing counts per class for several counting lines and polygon zones.
+    Zones come from config as {"name", "type": "line" | "polygon", "points": [[x, y], ...]} in percent
+    of the frame. A line counts "in" when a track center crosses it from right to left relative to
+    its first-to-last point direction (upwards for a line drawn left to right) and "out" the other
+    way; a polygon counts "in" on entry and "out" on exit.
+    Polygon membership is a lookup in a precomputed grid holding one bit per polygon, line crossings
+    are tested for all tracks against all lines at once, so the cost per frame barely grows with zones.
+    Previous centers and membership bits are kept per track by the caller's TrackStore.
+    '''
+    def __init__(self, zones: List[Dict[str, Any]], resolution: Tuple[int, int], grid: int = 4):
+        self.grid = max(int(grid), 1)
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        scale = np.array(self.resolution, dtype=np.float32) / 100
+        lines = [zone for zone in zones if zone.get("type", ZoneType.LINE) == ZoneType.LINE]
+        polygons = [zone for zone in zones if zone.get("type") == ZoneType.POLYGON]
+        if len(polygons) > 64:
+            raise ValueError("At most 64 polygon zones are supported")
+        self.names: List[str] = [zone.get("name", f"line_{i}") for i, zone in enumerate(lines)] + \
+                                [zone.get("name", f"zone_{i}") for i, zone in enumerate(polygons)]
+        self.line_count = len(lines)
+
+        points = np.array([np.asarray(zone["points"], dtype=np.float32)[[0, -1]] for zone in lines], dtype=np.float32).reshape(-1, 2, 2)
+        self.line_start = points[:, 0] * scale
+        self.line_vector = points[:, 1] * scale - self.line_start
+        self.line_length = np.maximum((self.line_vector ** 2).sum(axis=1), 1e-9)
+
+        height, width = self.resolution[1] // self.grid + 1, self.resolution[0] // self.grid + 1
+        self.mask = np.zeros((height, width), dtype=np.uint64)
+        self.polygons: List[np.ndarray] = []
+        layer = np.zeros((height, width), dtype=np.uint8)
+        for bit, zone in enumerate(polygons):
+            polygon = np.asarray(zone["points"], dtype=np.float32) * scale
+            self.polygons.append(polygon.astype(np.int32))
+            layer[...] = 0
+            cv2.fillPoly(layer, [np.round(polygon / self.grid).astype(np.int32)], 1)
+            self.mask[layer > 0] |= np.uint64(1 << bit)
+        self.bits = np.array([1 << bit for bit in range(len(polygons))], dtype=np.uint64)
+
+        self.counts = np.zeros((len(self.names), len(DIRECTIONS), 0), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def clear(self):
+        self.counts[...] = 0
+
+    def _membership(self, centers: np.ndarray) -> np.ndarray:
+        if len(self.bits) == 0:
+            return np.zeros(len(centers), dtype=np.uint64)
+        cells = (centers // self.grid).astype(np.int64)
+        x = np.clip(cells[:, 0], 0, self.mask.shape[1] - 1)
+        y = np.clip(cells[:, 1], 0, self.mask.shape[0] - 1)
+        return self.mask[y, x]
+
+    def _add(self, zones: np.ndarray, directions: np.ndarray, classes: np.ndarray):
+        if len(zones) == 0:
+            return
+        classes = classes.astype(np.int64)
+        if classes.max() >= self.counts.shape[2]:
+            grown = np.zeros(self.counts.shape[:2] + (classes.max() + 1,), dtype=np.int64)
+            grown[:, :, :self.counts.shape[2]] = self.counts
+            self.counts = grown
+        np.add.at(self.counts, (zones, directions, classes), 1)
+
+    def update(self, centers: np.ndarray, classes: np.ndarray, previous: np.ndarray, previous_inside: np.ndarray, known: np.ndarray) -> np.ndarray:
+        '''
+        Count the crossings between each known track's previous center and its center in this frame,
+        returns the polygon membership bits of the centers for the caller to keep with the track.
+        '''
+        centers = np.asarray(centers, dtype=np.float32)
+        inside = self._membership(centers)
+        if not known.any():
+            return inside
+        current, before, cls = centers[known], previous[known], classes[known]
+        if self.line_count:
+            side_before = self._side(before)
+            side_now = self._side(current)
+            crossed = side_before * side_now < 0
+            ratio = side_before / np.where(crossed, side_before - side_now, 1)
+            point = before[:, None, :] + ratio[:, :, None] * (current - before)[:, None, :]
+            along = ((point - self.line_start) * self.line_vector).sum(axis=2) / self.line_length
+            crossed &= (along >= 0) & (along <= 1)
+            tracks, lines = np.nonzero(crossed)
+            self._add(lines, (side_before[tracks, lines] < 0).astype(np.int64), cls[tracks])
+        if len(self.bits):
+            was_inside = previous_inside[known]
+            now_inside = inside[known]
+            entered = ((now_inside & ~was_inside)[:, None] & self.bits) != 0
+            left = ((was_inside & ~now_inside)[:, None] & self.bits) != 0
+            for direction, changed in enumerate((entered, left)):
+                tracks, zones = np.nonzero(changed)
+                self._add(zones + self.line_count, np.full(len(zones), direction), cls[tracks])
+        return inside
+
+    def _side(self, centers: np.ndarray) -> np.ndarray:
+        '''
+        Signed cross product of every center against every line, positive on the right of the line direction.
+        '''
+        offset = centers[:, None, :] - self.line_start[None, :, :]
+        return self.line_vector[None, :, 0] * offset[:, :, 1] - self.line_vector[None, :, 1] * offset[:, :, 0]
+
+    def get_counts(self, names: Optional[Dict[int, str]] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        names = names or {}
+        counts = {}
+        for zone, zone_name in enumerate(self.names):
+            counts[zone_name] = {
+                direction: {names.get(cls, str(cls)): int(self.counts[zone, index, cls]) for cls in np.flatnonzero(self.counts[zone, index]).tolist()}
+                for index, direction in enumerate(DIRECTIONS)
+            }
+        return counts
+
+    def draw(self, frame: np.ndarray, color: Tuple[int, int, int] = (0, 255, 255), scale: Tuple[float, float] = (1, 1)):
+        '''
+        Draw the zones in place on a frame, scale maps the configured resolution to the frame's.
+        '''
+        scale = np.asarray(scale, dtype=np.float32)
+        for start, vector in zip(self.line_start * scale, self.line_vector * scale):
+            cv2.line(frame, tuple(start.astype(int)), tuple((start + vector).astype(int)), color, 2)
+        if self.polygons:
+            cv2.polylines(frame, [(polygon * scale).astype(np.int32) for polygon in self.polygons], True, color, 2)
@@ -0,0 +1,38 @@
+import time
+import numpy as np
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+
+class Frame:
+    '''
+    Envelope for a captured image and the capture metadata that travels with it through the pipeline.
+    capture_time is time.monotonic() when the frame was read, wall_time the matching time.time(); replays
+    take both from the position in the recording instead. read_time is always the time.monotonic() of the
+    read and drives age(). dropped is the number of frames skipped by the capture ring right before this one.
+    '''
+    __slots__ = ('image', 'seq', 'capture_time', 'wall_time', 'source_id', 'dropped', 'read_time')
+
+    def __init__(self, image: np.ndarray, seq: int, capture_time: float, wall_time: float, source_id: str, dropped: int = 0,
+                 read_time: Optional[float] = None):
+        self.image = image
+        self.seq = seq
+        self.capture_time = capture_time
+        self.wall_time = wall_time
+        self.source_id = source_id
+        self.dropped = dropped
+        self.read_time = capture_time if read_time is None else read_time
+
+    def age(self) -> float:
+        return time.monotonic() - self.read_time
+
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.wall_time, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "capture_time": datetime.fromtimestamp(self.wall_time, tz=timezone.utc).isoformat(),
+            "source_id": self.source_id,
+            "dropped": self.dropped,
+            "latency": round(self.age(), 4),
+        }
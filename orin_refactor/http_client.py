@@ -0,0 +1,111 @@
+import time
+import logging
+import aiohttp
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Tuple
+from urllib.parse import urlsplit
+
+class EndpointStats:
+    __slots__ = ('requests', 'errors', 'latency', 'last_status')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.last_status = None
+
+    def record(self, elapsed: float, status):
+        self.requests += 1
+        self.latency = elapsed if self.requests == 1 else 0.8 * self.latency + 0.2 * elapsed
+        self.last_status = status
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency": round(self.latency, 4),
+            "last_status": self.last_status,
+        }
+
+class HttpClient:
+    '''
+    One long-lived aiohttp session per endpoint (scheme, host, port) for uploads and auth, so requests
+    reuse keep-alive connections instead of paying a TCP and TLS handshake each time. Connections
+    are pooled with a per-host limit, DNS lookups are cached, and each request's latency is recorded
+    per endpoint. Sessions are created on first use and rebuilt when the settings change.
+    '''
+    def __init__(self):
+        self.logger = logging.getLogger("app")
+        self.sessions: Dict[Tuple[str, str, int], aiohttp.ClientSession] = {}
+        self.stats: Dict[str, EndpointStats] = {}
+        self.settings: Tuple = ()
+        self.limit_per_host = 4
+        self.dns_ttl = 300
+        self.keepalive = 60.0
+        self.connect_timeout = 10.0
+        self.timeout = 60.0
+
+    async def configure(self, limit_per_host: int = 4, dns_ttl: int = 300, keepalive: float = 60,
+                        connect_timeout: float = 10, timeout: float = 60):
+        settings = (int(limit_per_host), int(dns_ttl), float(keepalive), float(connect_timeout), float(timeout))
+        if settings == self.settings:
+            return
+        self.settings = settings
+        self.limit_per_host, self.dns_ttl, self.keepalive, self.connect_timeout, self.timeout = settings
+        await self.close()
+
+    def _endpoint(self, url: str) -> Tuple[str, str, int]:
+        parts = urlsplit(url)
+        return parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80)
+
+    def session(self, url: str) -> aiohttp.ClientSession:
+        endpoint = self._endpoint(url)
+        session = self.sessions.get(endpoint)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                use_dns_cache=True,
+                keepalive_timeout=self.keepalive,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, connect=self.connect_timeout),
+            )
+            self.sessions[endpoint] = session
+        return session
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        '''
+        Send a request on the endpoint's pooled session, the latency covers the request up to the response headers.
+        '''
+        endpoint = "{}://{}:{}".format(*self._endpoint(url))
+        stats = self.stats.setdefault(endpoint, EndpointStats())
+        start = time.perf_counter()
+        try:
+            response = await self.session(url).request(method, url, **kwargs)
+        except Exception:
+            stats.record(time.perf_counter() - start, None)
+            raise
+        stats.record(time.perf_counter() - start, response.status)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    async def close(self):
+        sessions, self.sessions = list(self.sessions.values()), {}
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {endpoint: stats.to_dict() for endpoint, stats in self.stats.items()}
+
+http_client = HttpClient()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+import logging
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+FORMATS = {
+    'jpeg': ('.jpg', 'image/jpeg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', 'image/webp', cv2.IMWRITE_WEBP_QUALITY),
+    'png': ('.png', 'image/png', None),
+}
+
+class EncodedImage:
+    __slots__ = ('data', 'extension', 'content_type', 'encode_time')
+
+    def __init__(self, data: bytes, extension: str, content_type: str, encode_time: float):
+        self.data = data
+        self.extension = extension
+        self.content_type = content_type
+        self.encode_time = encode_time
+
+class ImageEncoder:
+    '''
+    Encodes upload images on a small worker pool instead of the event loop, downscaled to fit within
+    resolution and compressed as JPEG or WebP at the configured quality (PNG stays available).
+    Only the copy of the frame happens on the loop, since capture buffers are reused.
+    '''
+    def __init__(self, image_format: str = 'jpeg', quality: int = 85, resolution: Optional[Tuple[int, int]] = None, workers: int = 1):
+        self.logger = logging.getLogger("app")
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.workers = 0
+        self.encoded = 0
+        self.encode_time = 0.0
+        self.bytes = 0.0
+        self.last_bytes = 0
+        self.configure(image_format, quality, resolution, workers)
+
+    def configure(self, image_format: str = 'jpeg', quality: int = 85, resolution: Optional[Tuple[int, int]] = None, workers: int = 1):
+        image_format = str(image_format).lower()
+        if image_format == 'jpg':
+            image_format = 'jpeg'
+        if image_format not in FORMATS:
+            self.logger.warning(f"Unsupported upload format {image_format}, using jpeg")
+            image_format = 'jpeg'
+        self.format = image_format
+        self.quality = min(max(int(quality), 1), 100)
+        self.resolution = (int(resolution[0]), int(resolution[1])) if resolution else None
+        workers = max(int(workers), 1)
+        if workers != self.workers:
+            if self.executor:
+                self.executor.shutdown(wait=False)
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-encoder")
+            self.workers = workers
+
+    def _scale(self, image: np.ndarray) -> np.ndarray:
+        if not self.resolution:
+            return image
+        height, width = image.shape[:2]
+        scale = min(self.resolution[0] / width, self.resolution[1] / height)
+        if scale >= 1:
+            return image
+        return cv2.resize(image, (max(round(width * scale), 1), max(round(height * scale), 1)), interpolation=cv2.INTER_AREA)
+
+    def encode_sync(self, image: np.ndarray) -> EncodedImage:
+        start = time.perf_counter()
+        extension, content_type, flag = FORMATS[self.format]
+        params = [flag, self.quality] if flag is not None else []
+        ok, buffer = cv2.imencode(extension, self._scale(image), params)
+        if not ok:
+            raise ValueError(f"Failed to encode image as {self.format}")
+        data = buffer.tobytes()
+        elapsed = time.perf_counter() - start
+        self.encoded += 1
+        self.encode_time = elapsed if self.encoded == 1 else 0.8 * self.encode_time + 0.2 * elapsed
+        self.bytes = len(data) if self.encoded == 1 else 0.8 * self.bytes + 0.2 * len(data)
+        self.last_bytes = len(data)
+        return EncodedImage(data, extension, content_type, elapsed)
+
+    async def encode(self, frame: np.ndarray) -> EncodedImage:
+        if frame is None:
+            raise ValueError("No image to encode")
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.encode_sync, frame.copy())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "encoded": self.encoded,
+            "encode_time": round(self.encode_time, 4),
+            "bytes": int(self.bytes),
+            "last_bytes": self.last_bytes,
+        }
@@ -0,0 +1,260 @@
+import os
+import ast
+import time
+import logging
+import cv2
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+from ultralytics import YOLO
+from ultralytics.engine.results import Boxes
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import IterableSimpleNamespace
+from inference_scheduler import Tracks
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+BYTETRACK_ARGS = dict(
+    tracker_type="bytetrack",
+    track_high_thresh=0.25,
+    track_low_thresh=0.1,
+    new_track_thresh=0.25,
+    track_buffer=30,
+    match_thresh=0.8,
+    fuse_score=True,
+)
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    '''
+    Class-aware greedy non-maximum suppression, returns the indices to keep.
+    '''
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    offset = classes.reshape(-1, 1) * (boxes.max() + 1)
+    shifted = boxes + offset
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = np.argsort(-scores)
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        xx0 = np.maximum(shifted[best, 0], shifted[rest, 0])
+        yy0 = np.maximum(shifted[best, 1], shifted[rest, 1])
+        xx1 = np.minimum(shifted[best, 2], shifted[rest, 2])
+        yy1 = np.minimum(shifted[best, 3], shifted[rest, 3])
+        intersection = np.clip(xx1 - xx0, 0, None) * np.clip(yy1 - yy0, 0, None)
+        iou = intersection / (areas[best] + areas[rest] - intersection + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+class DetectionTracker:
+    '''
+    Associates raw detections (N x 6 xyxy, conf, cls) into tracks for backends and modes that
+    cannot use model.track.
+    '''
+    def __init__(self):
+        self.tracker: Optional[BYTETracker] = None
+
+    def reset(self):
+        self.tracker = None
+
+    def update(self, detections: np.ndarray, frame: np.ndarray) -> Optional[Tracks]:
+        if self.tracker is None:
+            self.tracker = BYTETracker(IterableSimpleNamespace(**BYTETRACK_ARGS))
+        tracks = self.tracker.update(Boxes(detections, frame.shape[:2]), frame)
+        if len(tracks) == 0:
+            return None
+        return tracks[:, :4].astype(np.float32), tracks[:, 4].astype(np.int64), tracks[:, 6].astype(np.float32)
+
+class InferenceBackend(ABC):
+    '''
+    Base class for inference runtimes. detect() returns one N x 6 array (x1, y1, x2, y2, conf, cls)
+    per image. Backends with can_track set also provide track(), keeping tracker state internally.
+    '''
+    name = "base"
+    can_track = False
+
+    def __init__(self, weight_path: str, device: str = "auto"):
+        self.logger = logging.getLogger("app")
+        self.weight_path = weight_path
+        self.device = device
+        self.names: Dict[int, str] = {}
+        self.latency: float = 0.0
+        self.warmup_latency: float = 0.0
+
+    @abstractmethod
+    def load(self):
+        ...
+
+    @abstractmethod
+    def detect(self, images: List[np.ndarray], conf: float) -> List[np.ndarray]:
+        ...
+
+    def track(self, image: np.ndarray, conf: float) -> Tuple[Optional[Tracks], Any]:
+        '''
+        Only available when can_track is set.
+        '''
+        raise NotImplementedError(f"The {self.name} backend has no built-in tracker, use detect() with a tracker")
+
+    def reset(self):
+        pass
+
+    def _record(self, start: float):
+        elapsed = time.perf_counter() - start
+        self.latency = elapsed if self.latency == 0 else 0.9 * self.latency + 0.1 * elapsed
+
+    def warmup(self, resolution: Tuple[int, int], runs: int = 3) -> float:
+        '''
+        Run a few inferences on a blank frame so lazy initialisation and kernel selection happen before
+        the first real frame, returns the mean latency of the runs after the first.
+        '''
+        image = np.zeros((resolution[1], resolution[0], 3), dtype=np.uint8)
+        timings = []
+        for _ in range(max(runs, 1)):
+            start = time.perf_counter()
+            if self.can_track:
+                self.track(image, 0.25)
+            else:
+                self.detect([image], 0.25)
+            timings.append(time.perf_counter() - start)
+        self.reset()
+        self.warmup_latency = float(np.mean(timings[1:] if len(timings) > 1 else timings))
+        self.latency = self.warmup_latency
+        self.logger.info(f"{self.name} backend on {self.device} warmed up, {self.warmup_latency * 1000:.1f} ms per frame")
+        return self.warmup_latency
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "device": str(self.device),
+            "weights": os.path.basename(self.weight_path),
+            "latency": round(self.latency, 4),
+            "warmup_latency": round(self.warmup_latency, 4),
+        }
+
+class TorchBackend(InferenceBackend):
+    '''
+    Ultralytics runtime, handles .pt checkpoints as well as TensorRT .engine files.
+    '''
+    name = "torch"
+    can_track = True
+
+    def load(self):
+        if self.device == "auto":
+            import torch
+            self.device = 0 if torch.cuda.is_available() else "cpu"
+        self.model = YOLO(self.weight_path)
+        self.names = self.model.names
+        return self
+
+    def detect(self, images: List[np.ndarray], conf: float) -> List[np.ndarray]:
+        start = time.perf_counter()
+        results = self.model.predict(images, conf=conf, show=False, save=False, verbose=False, device=self.device)
+        self._record(start)
+        return [result.boxes.data.cpu().numpy()[:, [0, 1, 2, 3, -2, -1]] for result in results]
+
+    def track(self, image: np.ndarray, conf: float) -> Tuple[Optional[Tracks], Any]:
+        start = time.perf_counter()
+        results = self.model.track(image, conf=conf, show=False, persist=True, save=False, verbose=False, device=self.device)
+        self._record(start)
+        if not results or results[0].boxes.id is None:
+            return None, results
+        boxes = results[0].boxes
+        return (boxes.xyxy.cpu().numpy(), boxes.id.int().cpu().numpy(), boxes.cls.cpu().numpy()), results
+
+    def reset(self):
+        predictor = getattr(self.model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", []) or []:
+            tracker.reset()
+
+class OnnxBackend(InferenceBackend):
+    '''
+    ONNX Runtime for exported YOLO detection models, using CUDA when available and the CPU otherwise.
+    '''
+    name = "onnx"
+    can_track = False
+
+    def load(self):
+        if ort is None:
+            raise ImportError("onnxruntime is not installed")
+        available = ort.get_available_providers()
+        providers = ["CPUExecutionProvider"]
+        if self.device != "cpu" and "CUDAExecutionProvider" in available:
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(self.weight_path, providers=providers)
+        self.device = self.session.get_providers()[0]
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2:4]
+        self.input_size = (width if isinstance(width, int) else 640, height if isinstance(height, int) else 640)
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()} if "names" in metadata else {}
+        self.canvas = np.full((self.input_size[1], self.input_size[0], 3), 114, dtype=np.uint8)
+        return self
+
+    def _preprocess(self, image: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        width, height = self.input_size
+        gain = min(width / image.shape[1], height / image.shape[0])
+        new_w, new_h = int(round(image.shape[1] * gain)), int(round(image.shape[0] * gain))
+        pad_x, pad_y = (width - new_w) // 2, (height - new_h) // 2
+        self.canvas[...] = 114
+        self.canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        blob = cv2.dnn.blobFromImage(self.canvas, 1 / 255.0, swapRB=True)
+        return blob, gain, (pad_x, pad_y)
+
+    def _postprocess(self, output: np.ndarray, conf: float, gain: float, pad: Tuple[int, int]) -> np.ndarray:
+        output = output[0]
+        if output.shape[0] < output.shape[1]:
+            predictions = output.T
+            scores = predictions[:, 4:].max(axis=1)
+            classes = predictions[:, 4:].argmax(axis=1).astype(np.float32)
+            keep = scores >= conf
+            xywh, scores, classes = predictions[keep, :4], scores[keep], classes[keep]
+            boxes = np.empty_like(xywh)
+            boxes[:, :2] = xywh[:, :2] - xywh[:, 2:] / 2
+            boxes[:, 2:] = xywh[:, :2] + xywh[:, 2:] / 2
+            keep = nms(boxes, scores, classes, 0.7)
+            boxes, scores, classes = boxes[keep], scores[keep], classes[keep]
+        else:
+            predictions = output[output[:, 4] >= conf]
+            boxes, scores, classes = predictions[:, :4].copy(), predictions[:, 4], predictions[:, 5]
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= gain
+        return np.hstack((boxes, scores[:, None], classes[:, None])).astype(np.float32)
+
+    def detect(self, images: List[np.ndarray], conf: float) -> List[np.ndarray]:
+        start = time.perf_counter()
+        detections = []
+        for image in images:
+            blob, gain, pad = self._preprocess(image)
+            output = self.session.run(None, {self.input_name: blob})[0]
+            detections.append(self._postprocess(output, conf, gain, pad))
+        self._record(start)
+        return detections
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def create_backend(weight_path: str, preference: str = "auto", device: str = "auto") -> InferenceBackend:
+    '''
+    Pick a backend from the weight file type unless one is forced, falling back to the ultralytics
+    runtime when the preferred one cannot be loaded.
+    '''
+    logger = logging.getLogger("app")
+    if preference in BACKENDS:
+        name = preference
+    else:
+        name = OnnxBackend.name if weight_path.endswith(".onnx") and ort is not None else TorchBackend.name
+    try:
+        return BACKENDS[name](weight_path, device).load()
+    except Exception as e:
+        if name == TorchBackend.name:
+            raise
+        logger.error(f"Could not load {name} backend for {weight_path}: {e}, falling back to torch")
+        return TorchBackend(weight_path, device).load()
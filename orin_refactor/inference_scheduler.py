@@ -0,0 +1,109 @@
+import numpy as np
+from typing import Optional, Tuple
+
+Tracks = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+def empty_tracks() -> Tracks:
+    return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+class TrackPredictor:
+    '''
+    Constant-velocity extrapolation of the tracks seen on the last detector run, so the counter
+    keeps receiving continuous tracks on frames where the detector is skipped.
+    Boxes are xyxy, velocities are box-center pixels per second estimated between detector runs.
+    '''
+    def __init__(self, smoothing: float = 0.5):
+        self.smoothing = smoothing
+        self.boxes, self.ids, self.classes = empty_tracks()
+        self.velocities = np.zeros((0, 2), dtype=np.float32)
+        self.timestamp: Optional[float] = None
+
+    def reset(self):
+        self.boxes, self.ids, self.classes = empty_tracks()
+        self.velocities = np.zeros((0, 2), dtype=np.float32)
+        self.timestamp = None
+
+    def update(self, tracks: Optional[Tracks], timestamp: float):
+        boxes, ids, classes = tracks if tracks is not None else empty_tracks()
+        velocities = np.zeros((len(ids), 2), dtype=np.float32)
+        if self.timestamp is not None and len(ids) and len(self.ids):
+            dt = timestamp - self.timestamp
+            order = np.argsort(self.ids)
+            sorted_ids = self.ids[order]
+            positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+            matched = sorted_ids[positions] == ids
+            if dt > 0 and matched.any():
+                previous = order[positions[matched]]
+                centers = (boxes[matched, :2] + boxes[matched, 2:]) / 2
+                previous_centers = (self.boxes[previous, :2] + self.boxes[previous, 2:]) / 2
+                measured = (centers - previous_centers) / dt
+                velocities[matched] = self.smoothing * measured + (1 - self.smoothing) * self.velocities[previous]
+        self.boxes = np.asarray(boxes, dtype=np.float32)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.float32)
+        self.velocities = velocities
+        self.timestamp = timestamp
+
+    def predict(self, timestamp: float) -> Optional[Tracks]:
+        if self.timestamp is None or len(self.ids) == 0:
+            return None
+        shift = self.velocities * (timestamp - self.timestamp)
+        return self.boxes + np.hstack((shift, shift)), self.ids, self.classes
+
+    def max_speed(self) -> float:
+        if len(self.velocities) == 0:
+            return 0.0
+        return float(np.sqrt((self.velocities ** 2).sum(axis=1)).max())
+
+class InferenceScheduler:
+    '''
+    Decides on which frames to run the detector. The interval between detector runs shrinks to
+    min_interval while there is motion, stretches to max_interval on a quiet scene, is capped so the
+    fastest track moves at most max_displacement pixels between runs, and never drops below
+    latency / duty_cycle so the detector cannot occupy more than that share of the time.
+    '''
+    def __init__(self, enabled: bool = False, min_fps: float = 2, max_fps: float = 0, max_displacement: float = 40, duty_cycle: float = 1.0):
+        self.enabled = enabled
+        self.max_interval = 1 / min_fps if min_fps > 0 else 0.0
+        self.min_interval = 1 / max_fps if max_fps > 0 else 0.0
+        self.max_displacement = float(max_displacement)
+        self.duty_cycle = min(max(float(duty_cycle), 0.01), 1.0)
+        self.latency: float = 0.0
+        self.motion_active: bool = True
+        self.max_speed: float = 0.0
+        self.last_run: Optional[float] = None
+        self.runs: int = 0
+        self.skipped: int = 0
+
+    def reset(self):
+        self.last_run = None
+        self.motion_active = True
+        self.max_speed = 0.0
+
+    def interval(self) -> float:
+        if not self.enabled:
+            return 0.0
+        interval = self.min_interval if self.motion_active else max(self.max_interval, self.min_interval)
+        if self.max_speed > 0:
+            interval = min(interval, self.max_displacement / self.max_speed)
+        return max(interval, self.min_interval, self.latency / self.duty_cycle)
+
+    def should_infer(self, timestamp: float) -> bool:
+        if self.last_run is None or timestamp - self.last_run >= self.interval():
+            return True
+        self.skipped += 1
+        return False
+
+    def record(self, timestamp: float, latency: float, max_speed: float):
+        self.last_run = timestamp
+        self.latency = latency
+        self.max_speed = max_speed
+        self.runs += 1
+
+    def get_stats(self):
+        return {
+            "enabled": self.enabled,
+            "interval": round(self.interval(), 4),
+            "runs": self.runs,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+class DropPolicy:
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+class InferenceWorker:
+    '''
+    Runs a blocking inference callable on a dedicated thread so the event loop keeps serving
+    websocket, telemetry, uploads and stream writes. Requests go through a bounded queue:
+    drop_oldest resolves the oldest pending request with None to make room, drop_newest rejects
+    the new request with None and block waits for space (backpressure).
+    Requests are processed one at a time and in order, which stateful trackers rely on.
+    '''
+    def __init__(self, infer: Callable[[Any], Any], max_queue: int = 2, policy: str = DropPolicy.DROP_OLDEST, name: str = "inference"):
+        self.logger = logging.getLogger("app")
+        self.infer = infer
+        self.max_queue = max(int(max_queue), 1)
+        self.policy = policy
+        self.name = name
+        self.queue: Deque[Tuple[Any, asyncio.Future]] = deque()
+        self.condition = threading.Condition()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread: Optional[threading.Thread] = None
+        self.running: bool = False
+        self.space_available = asyncio.Event()
+        self.processed: int = 0
+        self.dropped: int = 0
+        self.latency: float = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Started {self.name} worker, queue size {self.max_queue}, policy {self.policy}")
+
+    async def submit(self, item: Any) -> Any:
+        '''
+        Queue item for inference and wait for its result, dropped requests resolve to None.
+        '''
+        if not self.running:
+            raise RuntimeError(f"{self.name} worker is not running")
+        future = self.loop.create_future()
+        while True:
+            if not self.running:
+                return None
+            with self.condition:
+                if len(self.queue) < self.max_queue:
+                    self.queue.append((item, future))
+                    self.condition.notify()
+                    break
+                if self.policy == DropPolicy.DROP_OLDEST:
+                    _, oldest = self.queue.popleft()
+                    self._drop(oldest)
+                    self.queue.append((item, future))
+                    self.condition.notify()
+                    break
+                if self.policy == DropPolicy.DROP_NEWEST:
+                    self._drop(future)
+                    break
+                self.space_available.clear()
+            await self.space_available.wait()
+        return await future
+
+    def _drop(self, future: asyncio.Future):
+        self.dropped += 1
+        if not future.done():
+            future.set_result(None)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                item, future = self.queue.popleft()
+                self.loop.call_soon_threadsafe(self.space_available.set)
+            start = time.perf_counter()
+            try:
+                result, error = self.infer(item), None
+            except Exception as e:
+                result, error = None, e
+            elapsed = time.perf_counter() - start
+            self.latency = elapsed if self.processed == 0 else 0.9 * self.latency + 0.1 * elapsed
+            self.processed += 1
+            try:
+                self.loop.call_soon_threadsafe(self._resolve, future, result, error)
+            except RuntimeError:
+                break
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any, error: Optional[Exception]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def stop(self):
+        if not self.running:
+            return
+        with self.condition:
+            self.running = False
+            pending = list(self.queue)
+            self.queue.clear()
+            self.condition.notify_all()
+        for _, future in pending:
+            if not future.done():
+                future.set_result(None)
+        self.space_available.set()
+        if self.thread:
+            await asyncio.get_running_loop().run_in_executor(None, self.thread.join, 5)
+            self.thread = None
+        self.logger.info(f"Stopped {self.name} worker")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "latency": round(self.latency, 4),
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "queue": len(self.queue),
+        }
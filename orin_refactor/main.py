@@ -8,6 +8,11 @@ from auth_manager import AuthManager
 import websockets
 from websocket_client import WebSocketClient
 from upload_manager import UploadManager
+from model_registry import model_registry
+from count_aggregator import count_aggregator
+from preview_server import preview_server
+from http_client import http_client
+from frame import Frame
 from socket_types import *
 import json
 from logger import logger
@@ -28,6 +33,8 @@ class TrackingApplication:
         self.tracker_manager = None
         self.tracking_task = None
         self.telemetry_task = None
+        self.calibration_task = None
+        self.count_report_task = None
         self.current_mode = Mode.IDLE
         self.error_queue = []
         self.stream = False
@@ -36,16 +43,65 @@ class TrackingApplication:
 
     async def initialize(self):
         await self.config_manager.load_config()
+        await self.configure_http()
         await self.database_manager.initialize()
         await self.upload_manager.initialize()
         await self.auth_manager.initialize()
         await self.websocket_client.connect()
         self.telemetry_interval = self.config_manager.get(ConfigKeys.telemetry_interval, 3)
         self.device_id = os.getenv("DEVICE_ID")
+        await self.preload_models()
+        await self.configure_preview()
+        self.count_report_task = asyncio.create_task(self.run_count_reporting())
         
         initial_mode = Mode(self.config_manager.get(ConfigKeys.mode, Mode.IDLE))
         await self.set_mode(initial_mode)
 
+    async def preload_models(self):
+        '''
+        Load the selectable weights up front so mode switches and weight changes do not wait on disk and warm-up.
+        '''
+        model_registry.memory_budget = int(float(self.config_manager.get(ConfigKeys.model_memory_budget, 2048)) * 1024 * 1024)
+        if not self.config_manager.get(ConfigKeys.preload_weights, True):
+            return
+        current = self.config_manager.get(ConfigKeys.weights, 'best.pt')
+        weights = [w for w in self.config_manager.get(ConfigKeys.available_weights, []) if w != current] + [current]
+        await model_registry.preload(
+            [f"weights/{w}" for w in weights],
+            self.config_manager.get(ConfigKeys.inference_backend, "auto"),
+            self.config_manager.get(ConfigKeys.inference_device, "auto"),
+            int(self.config_manager.get(ConfigKeys.inference_warmup_runs, 3)),
+            self.config_manager.get(PayloadKeys.RESOLUTION, (640, 480)),
+        )
+
+    async def configure_http(self):
+        await http_client.configure(
+            int(self.config_manager.get(ConfigKeys.http_limit_per_host, 4)),
+            int(self.config_manager.get(ConfigKeys.http_dns_ttl, 300)),
+            float(self.config_manager.get(ConfigKeys.http_keepalive, 60)),
+            float(self.config_manager.get(ConfigKeys.http_connect_timeout, 10)),
+            float(self.config_manager.get(ConfigKeys.http_timeout, 60)),
+        )
+
+    async def configure_preview(self):
+        '''
+        Start, stop or retune the local preview server to match the configuration.
+        '''
+        if not self.config_manager.get(ConfigKeys.preview_enabled, False):
+            await preview_server.stop()
+            return
+        try:
+            await preview_server.start(
+                self.config_manager.get(ConfigKeys.preview_host, "0.0.0.0"),
+                int(self.config_manager.get(ConfigKeys.preview_port, 8080)),
+                float(self.config_manager.get(ConfigKeys.preview_fps, 5)),
+                int(self.config_manager.get(ConfigKeys.preview_quality, 70)),
+                int(self.config_manager.get(ConfigKeys.preview_width, 640)),
+            )
+        except OSError as e:
+            self.logger.error(f"Failed to start preview server: {e}")
+            await self.append_error(e)
+
     async def set_mode(self, new_mode: Mode):
         self.logger.info(f"Setting Mode to {new_mode}")
         if new_mode == self.current_mode:
@@ -87,7 +143,7 @@ class TrackingApplication:
     async def run_tracking(self):
         try:
             async for tracking_data, frame in self.tracker_manager.run():
-                if tracking_data:
+                if tracking_data and self.config_manager.get(ConfigKeys.send_tracking_events, False):
                     await self.handle_tracking_data(tracking_data, frame)
         except asyncio.CancelledError:
             self.logger.info("Tracking task cancelled")
@@ -112,18 +168,71 @@ class TrackingApplication:
             await self.upload_stored_data()
             
     async def run_calibration(self):
-        if self.tracker_manager is None:
-            self.tracker_manager = TrackerManager(self.config_manager,Mode.CALIBRATE)
-        result = await self.tracker_manager.calibrate()
-        await self.websocket_client.send_message(Message(self.device_id,topic = Topic.CALIBRATION_RESULT,action=Action.SET_VALUE,payload = Payload(data={PayloadKeys.CALIBRATION_RESULT:result})))
-        await self.tracker_manager.cleanup()
-        await self.set_mode(Mode.IDLE)
+        if self.calibration_task and not self.calibration_task.done():
+            self.logger.info("Calibration already running")
+            return
+        self.calibration_task = asyncio.create_task(self._calibrate())
+
+    async def _calibrate(self):
+        '''
+        Calibrate next to the active mode when there is one, otherwise on a temporary tracker.
+        '''
+        tracker_manager = self.tracker_manager
+        standalone = tracker_manager is None or self.config_manager.get(ConfigKeys.calibration_source, None)
+        if standalone:
+            tracker_manager = TrackerManager(self.config_manager,Mode.CALIBRATE)
+        try:
+            result = await tracker_manager.calibrate(self.send_calibration_progress)
+            if self.config_manager.get(ConfigKeys.apply_calibration, False):
+                await self.config_manager.update({ConfigKeys.motion_iou: result})
+                if self.tracker_manager:
+                    self.tracker_manager.motion_iou = result
+            await self.websocket_client.send_message(Message(self.device_id,topic = Topic.CALIBRATION_RESULT,action=Action.SET_VALUE,payload = Payload(data={PayloadKeys.CALIBRATION_RESULT:result})))
+        except Exception as e:
+            await self.append_error(e)
+            self.logger.error(f"Error running calibration: {e}")
+        finally:
+            if standalone:
+                await tracker_manager.cleanup()
+
+    async def run_count_reporting(self):
+        '''
+        Ship the closed count buckets once per bucket period. Drained buckets that could not be sent
+        are kept in the local database and resent by upload_stored_data.
+        '''
+        while True:
+            await asyncio.sleep(float(self.config_manager.get(ConfigKeys.count_bucket_seconds, 60)))
+            if not self.config_manager.get(ConfigKeys.send_count_buckets, True):
+                continue
+            try:
+                names = {int(k): v for k, v in (self.config_manager.get(ConfigKeys.names, {}) or {}).items()}
+                now = self.tracker_manager.capture_manager.now() if self.tracker_manager else time.time()
+                buckets = count_aggregator.drain(now, names)
+                if not buckets["minutes"] and not buckets["hours"]:
+                    continue
+                sent = False
+                try:
+                    if self.websocket_client.is_connected():
+                        sent = await self.websocket_client.send_count_buckets(buckets)
+                except Exception as e:
+                    self.logger.error(f"Error sending count buckets: {e}")
+                if not sent:
+                    await self.database_manager.store_data({PayloadKeys.COUNT_BUCKETS: buckets})
+            except Exception as e:
+                await self.append_error(e)
+                self.logger.error(f"Error reporting count buckets: {e}")
+
+    async def send_calibration_progress(self, progress: Dict[str, Any]):
+        if not self.websocket_client.is_connected():
+            return
+        await self.websocket_client.send_message(Message(self.device_id,topic = Topic.CALIBRATION_PROGRESS,action=Action.SET_VALUE,payload = Payload(data={PayloadKeys.CALIBRATION_PROGRESS:progress})))
             
-    async def handle_tracking_data(self, tracking_data: Dict[str, Any], frame):
-        timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    async def handle_tracking_data(self, tracking_data: Dict[str, Any], frame: Frame):
+        timestamp = frame.timestamp()
+        tracking_data[PayloadKeys.FRAME] = frame.to_dict()
         if self.config_manager.get('enable_uploads', False):
             try:
-                await self.upload_manager.upload( frame,tracking_data,timestamp)
+                await self.upload_manager.upload(frame.image,tracking_data,timestamp)
             except Exception as e:
                 await self.append_error(e)
                 self.logger.error(f"error uploading data: {e}")
@@ -133,7 +242,7 @@ class TrackingApplication:
                 if self.config_manager.get("save_images",False):
                     filename = str(round(time.time()) * 1000)
                     tracking_data['timestamp'] = timestamp
-                    cv2.imwrite(f"output/{filename}.jpg",frame)
+                    cv2.imwrite(f"output/{filename}.jpg",frame.image)
                     tracking_data['file_name'] = filename
                 await self.database_manager.store_data(tracking_data)
 
@@ -153,10 +262,36 @@ class TrackingApplication:
             
     async def handle_config_update(self, config: Dict[str, Any]):
         try:
+            changed = self.config_manager.diff(config)
             await self.config_manager.update(config)
-            await self.reset()
+            await self.apply_config(changed)
         except Exception as e:
             await self.append_error(e) 
+
+    async def apply_config(self, changed: Dict[str, Any]):
+        '''
+        Apply only what changed, the tracker is rebuilt only for changes it cannot take in place.
+        '''
+        if not changed:
+            self.logger.info("No change in configuration")
+            return
+        if PayloadKeys.MODE in changed:
+            await self.config_manager.update({PayloadKeys.MODE: self.current_mode})
+        if changed.keys() & {ConfigKeys.use_cloud_function, ConfigKeys.upload_url, ConfigKeys.enable_uploads, "server_upload_url",
+                             ConfigKeys.upload_format, ConfigKeys.upload_quality, ConfigKeys.upload_resolution, ConfigKeys.upload_encode_workers}:
+            await self.upload_manager.initialize()
+        if ConfigKeys.telemetry_interval in changed:
+            self.telemetry_interval = self.config_manager.get(ConfigKeys.telemetry_interval, 3)
+        if ConfigKeys.model_memory_budget in changed:
+            model_registry.memory_budget = int(float(self.config_manager.get(ConfigKeys.model_memory_budget, 2048)) * 1024 * 1024)
+        if changed.keys() & {ConfigKeys.preview_enabled, ConfigKeys.preview_host, ConfigKeys.preview_port,
+                             ConfigKeys.preview_fps, ConfigKeys.preview_quality, ConfigKeys.preview_width}:
+            await self.configure_preview()
+        if changed.keys() & {ConfigKeys.http_limit_per_host, ConfigKeys.http_dns_ttl, ConfigKeys.http_keepalive,
+                             ConfigKeys.http_connect_timeout, ConfigKeys.http_timeout}:
+            await self.configure_http()
+        if self.tracker_manager and not await self.tracker_manager.apply_config(changed):
+            await self.reset()
             
     async def reset(self):
         prev_mode = self.current_mode
@@ -214,6 +349,8 @@ class TrackingApplication:
                 tracker_state = self.tracker_manager.get_state()
                 tracker_state[PayloadKeys.CPU_USAGE] = cpu_usage
                 tracker_state[PayloadKeys.MEMORY_USAGE] =  memory_usage
+                tracker_state[PayloadKeys.HTTP] = http_client.get_stats()
+                tracker_state[PayloadKeys.UPLOAD] = self.upload_manager.get_stats()
                 return tracker_state
             return {
             PayloadKeys.TRACKING: False,
@@ -223,7 +360,9 @@ class TrackingApplication:
             PayloadKeys.TRACKER_ALIVE:  False,
             PayloadKeys.CPU_USAGE : cpu_usage,
             PayloadKeys.MEMORY_USAGE: memory_usage,
-            PayloadKeys.STREAM: self.stream
+            PayloadKeys.STREAM: self.stream,
+            PayloadKeys.HTTP: http_client.get_stats(),
+            PayloadKeys.UPLOAD: self.upload_manager.get_stats(),
             }
         
         except Exception as e:
@@ -239,10 +378,14 @@ class TrackingApplication:
             
     async def cleanup(self):
         self.logger.info("Cleaning up resources...")
+        if self.count_report_task:
+            self.count_report_task.cancel()
         if self.tracker_manager:
             await self.tracker_manager.cleanup()
+        await preview_server.stop()
         await self.websocket_client.disconnect()
         await self.auth_manager.cleanup()
+        await http_client.close()
 
     async def upload_stored_data(self):
         while True:
@@ -254,7 +397,12 @@ class TrackingApplication:
                 if not self.websocket_client.is_connected():
                     return  # stop if connection is lost again
                 try:
-                    json_data = json.loads(data)
+                    json_data = json.loads(data) if isinstance(data, str) else data
+                    if PayloadKeys.COUNT_BUCKETS in json_data:
+                        if not await self.websocket_client.send_count_buckets(json_data[PayloadKeys.COUNT_BUCKETS]):
+                            return
+                        await self.database_manager.delete_sent_data([id])
+                        continue
                     if json_data['file_name']:
                         await self.upload_manager.upload_stored_data(json_data['file_name'],json_data,json_data['timestamp'])
                     await self.upload_manager.upload(None, json_data, json_data['timestamp'])
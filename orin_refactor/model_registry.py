@@ -0,0 +1,103 @@
+import asyncio
+import os
+import logging
+import psutil
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from inference_backend import InferenceBackend, create_backend
+
+ModelKey = Tuple[str, str, str]
+
+class ModelEntry:
+    __slots__ = ('backend', 'memory', 'users')
+
+    def __init__(self, backend: InferenceBackend, memory: int):
+        self.backend = backend
+        self.memory = memory
+        self.users = 0
+
+class ModelRegistry:
+    '''
+    Process-wide cache of loaded inference backends keyed by weight file, backend preference and device,
+    so mode switches and config updates reuse warmed-up models instead of reloading them from disk.
+    Models that are not in use are evicted least recently used first once memory_budget (bytes) is exceeded.
+    '''
+    def __init__(self, memory_budget: int = 2048 * 1024 * 1024):
+        self.logger = logging.getLogger("app")
+        self.memory_budget = memory_budget
+        self.entries: "OrderedDict[ModelKey, ModelEntry]" = OrderedDict()
+        self.lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(weight_path: str, preference: str, device) -> ModelKey:
+        return os.path.abspath(weight_path), str(preference), str(device)
+
+    def _load(self, weight_path: str, preference: str, device, warmup_runs: int, resolution) -> Tuple[InferenceBackend, int]:
+        process = psutil.Process()
+        before = process.memory_info().rss
+        backend = create_backend(weight_path, preference, device)
+        if warmup_runs > 0:
+            backend.warmup(resolution, warmup_runs)
+        memory = process.memory_info().rss - before
+        if memory <= 0:
+            memory = os.path.getsize(weight_path)
+        return backend, memory
+
+    async def acquire(self, weight_path: str, preference: str = "auto", device="auto", warmup_runs: int = 3, resolution=(640, 480)) -> InferenceBackend:
+        '''
+        Return a loaded backend for the weights, loading it off the event loop when it is not cached.
+        Tracker state is reset so a reused model starts with fresh track ids.
+        '''
+        key = self._key(weight_path, preference, device)
+        async with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.logger.info(f"Loading model {weight_path}")
+                backend, memory = await asyncio.get_running_loop().run_in_executor(
+                    None, self._load, weight_path, preference, device, warmup_runs, resolution
+                )
+                entry = ModelEntry(backend, memory)
+                self.entries[key] = entry
+            else:
+                self.logger.info(f"Reusing loaded model {weight_path}")
+                entry.backend.reset()
+            self.entries.move_to_end(key)
+            entry.users += 1
+            self._evict()
+            return entry.backend
+
+    def release(self, backend: InferenceBackend):
+        for entry in self.entries.values():
+            if entry.backend is backend:
+                entry.users = max(entry.users - 1, 0)
+                break
+        self._evict()
+
+    async def preload(self, weight_paths: List[str], preference: str = "auto", device="auto", warmup_runs: int = 3, resolution=(640, 480)):
+        for weight_path in weight_paths:
+            try:
+                backend = await self.acquire(weight_path, preference, device, warmup_runs, resolution)
+                self.release(backend)
+            except Exception as e:
+                self.logger.error(f"Error preloading model {weight_path}: {e}")
+
+    def _evict(self):
+        for key in list(self.entries):
+            if self.memory_used() <= self.memory_budget:
+                break
+            entry = self.entries[key]
+            if entry.users == 0:
+                self.logger.info(f"Evicting model {key[0]} ({entry.memory // (1024 * 1024)} MB)")
+                del self.entries[key]
+
+    def memory_used(self) -> int:
+        return sum(entry.memory for entry in self.entries.values())
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "models": [os.path.basename(key[0]) for key in self.entries],
+            "memory_mb": round(self.memory_used() / (1024 * 1024), 1),
+            "budget_mb": round(self.memory_budget / (1024 * 1024), 1),
+        }
+
+model_registry = ModelRegistry()
@@ -0,0 +1,119 @@
+import asyncio
+import math
+import numpy as np
+from typing import Dict, Any, Optional
+from motion_detector import MotionDetector
+
+class RunningStats:
+    '''
+    Welford's online mean and variance.
+    '''
+    def __init__(self):
+        self.count: int = 0
+        self.mean: float = 0.0
+        self.m2: float = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+class QuantileSketch:
+    '''
+    Fixed-bin histogram sketch for values in [low, high], quantiles are interpolated inside a bin.
+    Memory stays constant no matter how many values are added.
+    '''
+    def __init__(self, bins: int = 2000, low: float = 0.0, high: float = 1.0):
+        self.bins = bins
+        self.low = low
+        self.high = high
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count: int = 0
+
+    def add(self, value: float):
+        index = int((value - self.low) / (self.high - self.low) * self.bins)
+        self.counts[min(max(index, 0), self.bins - 1)] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return self.low
+        target = min(max(q, 0.0), 1.0) * self.count
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, target, side='left'))
+        index = min(index, self.bins - 1)
+        below = cumulative[index - 1] if index > 0 else 0
+        in_bin = self.counts[index]
+        fraction = (target - below) / in_bin if in_bin else 0.0
+        width = (self.high - self.low) / self.bins
+        return self.low + (index + fraction) * width
+
+class MotionCalibrator:
+    '''
+    Streaming motion calibration. Frames are sampled every interval seconds of capture time,
+    scored with a dedicated MotionDetector and folded into running statistics, so calibration can
+    run next to an active mode or on a recorded clip without keeping the samples around.
+    '''
+    def __init__(self, detector: MotionDetector, length: int, interval: float, percentile: float = 95):
+        self.detector = detector
+        self.length = max(int(length), 1)
+        self.interval = float(interval)
+        self.percentile = float(percentile)
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+        self.last_sample: Optional[float] = None
+        self.done: bool = False
+        self.updated = asyncio.Event()
+
+    def observe(self, image: np.ndarray, timestamp: float) -> bool:
+        '''
+        Feed a frame captured at timestamp (seconds), returns True when a sample was taken.
+        '''
+        if self.done:
+            return False
+        if self.last_sample is not None and timestamp - self.last_sample < self.interval:
+            return False
+        self.last_sample = timestamp
+        warm = self.detector.initialized
+        score = self.detector.update(image)
+        if not warm:
+            return False
+        self.stats.add(score)
+        self.sketch.add(score)
+        if self.stats.count >= self.length:
+            self.done = True
+        self.updated.set()
+        return True
+
+    def finish(self):
+        self.done = True
+        self.updated.set()
+
+    @property
+    def progress(self) -> float:
+        return min(self.stats.count / self.length, 1.0)
+
+    def threshold(self) -> float:
+        if self.stats.count == 0:
+            raise ValueError("No calibration samples collected")
+        threshold = self.sketch.quantile(self.percentile / 100)
+        return min(max(threshold, 0.01), 0.99)
+
+    def get_progress(self) -> Dict[str, Any]:
+        return {
+            "progress": round(self.progress, 3),
+            "samples": self.stats.count,
+            "mean": round(self.stats.mean, 5),
+            "std": round(self.stats.std, 5),
+            "percentile": self.percentile,
+            "done": self.done,
+        }
@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+
+Region = Tuple[float, float, float, float]
+
+class MotionDetector:
+    '''
+    Running-background motion detector working on a decimated grayscale copy of the frame.
+    All intermediate images are allocated once per input resolution and reused in place.
+    Only the bounding box of the configured regions (x0, y0, x1, y1 as fractions of the frame) is processed.
+    update() returns the highest per-region fraction of pixels that differ from the background
+    by more than pixel_threshold, the per-region values are kept in scores.
+    '''
+    def __init__(self, width: int = 160, learning_rate: float = 0.05, pixel_threshold: int = 15, blur_size: int = 5):
+        self.width = int(width)
+        self.learning_rate = float(learning_rate)
+        self.pixel_threshold = int(pixel_threshold)
+        self.blur_size = int(blur_size) | 1
+        self.regions: List[Region] = [(0.0, 0.0, 1.0, 1.0)]
+        self.input_shape: Optional[Tuple[int, int]] = None
+        self.crop: Tuple[slice, slice] = (slice(None), slice(None))
+        self.region_slices: List[Tuple[slice, slice]] = []
+        self.size: Tuple[int, int] = (0, 0)
+        self.small: Optional[np.ndarray] = None
+        self.gray: Optional[np.ndarray] = None
+        self.background: Optional[np.ndarray] = None
+        self.background_u8: Optional[np.ndarray] = None
+        self.diff: Optional[np.ndarray] = None
+        self.mask: Optional[np.ndarray] = None
+        self.initialized: bool = False
+        self.score: float = 0.0
+        self.scores: List[float] = []
+
+    def configure(self, width: int, learning_rate: float, pixel_threshold: int):
+        if int(width) != self.width:
+            self.width = int(width)
+            self.input_shape = None
+        self.learning_rate = float(learning_rate)
+        self.pixel_threshold = int(pixel_threshold)
+
+    def set_regions(self, regions: List[Region]):
+        clipped = []
+        for x0, y0, x1, y1 in regions:
+            x0, x1 = sorted((min(max(float(x0), 0.0), 1.0), min(max(float(x1), 0.0), 1.0)))
+            y0, y1 = sorted((min(max(float(y0), 0.0), 1.0), min(max(float(y1), 0.0), 1.0)))
+            if x1 > x0 and y1 > y0:
+                clipped.append((x0, y0, x1, y1))
+        clipped = clipped or [(0.0, 0.0, 1.0, 1.0)]
+        if clipped != self.regions:
+            self.regions = clipped
+            self.input_shape = None
+
+    def reset(self):
+        self.initialized = False
+        self.score = 0.0
+        self.scores = [0.0] * len(self.regions)
+
+    def _allocate(self, shape: Tuple[int, int]):
+        frame_height, frame_width = shape
+        left = int(min(r[0] for r in self.regions) * frame_width)
+        top = int(min(r[1] for r in self.regions) * frame_height)
+        right = max(int(np.ceil(max(r[2] for r in self.regions) * frame_width)), left + 1)
+        bottom = max(int(np.ceil(max(r[3] for r in self.regions) * frame_height)), top + 1)
+        factor = max(int(np.ceil((right - left) / self.width)), 1)
+        small_width = max((right - left) // factor, 1)
+        small_height = max((bottom - top) // factor, 1)
+        # Whole multiples of the decimation factor keep cv2.resize on its fast INTER_AREA path
+        right = min(left + small_width * factor, frame_width)
+        bottom = min(top + small_height * factor, frame_height)
+        self.crop = (slice(top, bottom), slice(left, right))
+        self.size = (small_width, small_height)
+        self.region_slices = []
+        for x0, y0, x1, y1 in self.regions:
+            sx0 = min(int((x0 * frame_width - left) / factor), small_width - 1)
+            sy0 = min(int((y0 * frame_height - top) / factor), small_height - 1)
+            sx1 = min(max(int(np.ceil((x1 * frame_width - left) / factor)), sx0 + 1), small_width)
+            sy1 = min(max(int(np.ceil((y1 * frame_height - top) / factor)), sy0 + 1), small_height)
+            self.region_slices.append((slice(sy0, sy1), slice(sx0, sx1)))
+        self.small = np.empty((small_height, small_width, 3), dtype=np.uint8)
+        self.gray = np.empty((small_height, small_width), dtype=np.uint8)
+        self.background = np.empty((small_height, small_width), dtype=np.float32)
+        self.background_u8 = np.empty((small_height, small_width), dtype=np.uint8)
+        self.diff = np.empty((small_height, small_width), dtype=np.uint8)
+        self.mask = np.empty((small_height, small_width), dtype=np.uint8)
+        self.input_shape = shape
+        self.initialized = False
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        if self.input_shape != frame.shape[:2]:
+            self._allocate(frame.shape[:2])
+        cv2.resize(frame[self.crop], self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        cv2.GaussianBlur(self.gray, (self.blur_size, self.blur_size), 0, dst=self.gray)
+        return self.gray
+
+    def update(self, frame: np.ndarray) -> float:
+        gray = self._prepare(frame)
+        if not self.initialized:
+            self.background[...] = gray
+            self.initialized = True
+            self.score = 0.0
+            self.scores = [0.0] * len(self.region_slices)
+            return self.score
+
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(gray, self.background_u8, dst=self.diff)
+        cv2.threshold(self.diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self.mask)
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+        self.scores = [cv2.countNonZero(self.mask[ys, xs]) / self.mask[ys, xs].size for ys, xs in self.region_slices]
+        self.score = max(self.scores)
+        return self.score
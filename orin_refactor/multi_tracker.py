@@ -0,0 +1,205 @@
+import numpy as np
+from typing import Optional, Tuple
+from scipy.optimize import linear_sum_assignment
+from inference_scheduler import Tracks
+
+STD_POSITION = 1 / 20
+STD_VELOCITY = 1 / 160
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    '''
+    Pairwise IoU between two sets of xyxy boxes, returns a len(a) x len(b) matrix.
+    '''
+    xx0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    yy0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    xx1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    yy1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(xx1 - xx0, 0, None) * np.clip(yy1 - yy0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+def xyxy_to_xyah(boxes: np.ndarray) -> np.ndarray:
+    width = boxes[:, 2] - boxes[:, 0]
+    height = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    return np.stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2, width / height, height), axis=1)
+
+def xyah_to_xyxy(xyah: np.ndarray) -> np.ndarray:
+    width = xyah[:, 2] * xyah[:, 3]
+    half = np.stack((width, xyah[:, 3]), axis=1) / 2
+    return np.hstack((xyah[:, :2] - half, xyah[:, :2] + half))
+
+class KalmanBoxFilter:
+    '''
+    Constant-velocity Kalman filter over (cx, cy, aspect, height) applied to all tracks at once,
+    means are N x 8 and covariances N x 8 x 8. Noise scales with box height as in SORT/ByteTrack.
+    '''
+    def __init__(self):
+        self.motion = np.eye(8)
+        self.motion[:4, 4:] = np.eye(4)
+        self.diagonal = np.arange(8)
+
+    def initiate(self, measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        height = measurements[:, 3]
+        ones = np.ones_like(height)
+        std = np.stack((
+            2 * STD_POSITION * height, 2 * STD_POSITION * height, 1e-2 * ones, 2 * STD_POSITION * height,
+            10 * STD_VELOCITY * height, 10 * STD_VELOCITY * height, 1e-5 * ones, 10 * STD_VELOCITY * height,
+        ), axis=1)
+        mean = np.hstack((measurements, np.zeros_like(measurements)))
+        covariance = np.zeros((len(measurements), 8, 8))
+        covariance[:, self.diagonal, self.diagonal] = std ** 2
+        return mean, covariance
+
+    def predict(self, mean: np.ndarray, covariance: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        height = mean[:, 3]
+        ones = np.ones_like(height)
+        std = np.stack((
+            STD_POSITION * height, STD_POSITION * height, 1e-2 * ones, STD_POSITION * height,
+            STD_VELOCITY * height, STD_VELOCITY * height, 1e-5 * ones, STD_VELOCITY * height,
+        ), axis=1)
+        mean = mean @ self.motion.T
+        covariance = self.motion @ covariance @ self.motion.T
+        covariance[:, self.diagonal, self.diagonal] += std ** 2
+        return mean, covariance
+
+    def update(self, mean: np.ndarray, covariance: np.ndarray, measurements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        height = mean[:, 3]
+        ones = np.ones_like(height)
+        std = np.stack((STD_POSITION * height, STD_POSITION * height, 1e-1 * ones, STD_POSITION * height), axis=1)
+        innovation_cov = covariance[:, :4, :4].copy()
+        innovation_cov[:, self.diagonal[:4], self.diagonal[:4]] += std ** 2
+        gain = np.linalg.solve(innovation_cov, covariance[:, :4, :]).transpose(0, 2, 1)
+        mean = mean + np.einsum('nij,nj->ni', gain, measurements - mean[:, :4])
+        covariance = covariance - gain @ innovation_cov @ gain.transpose(0, 2, 1)
+        return mean, covariance
+
+class MultiObjectTracker:
+    '''
+    ByteTrack-style tracker over detection arrays (N x 6 xyxy, conf, cls) from any backend.
+    High-confidence detections are matched to confirmed and lost tracks first, low-confidence ones
+    then rescue the tracks that are still unmatched, and new tracks are only confirmed once they are
+    matched again. All track state lives in flat arrays on the instance and reset() clears it.
+    '''
+    def __init__(self, high_thresh: float = 0.25, low_thresh: float = 0.1, new_track_thresh: float = 0.25,
+                 match_thresh: float = 0.8, track_buffer: int = 30, fuse_score: bool = True):
+        self.high_thresh = float(high_thresh)
+        self.low_thresh = float(low_thresh)
+        self.new_track_thresh = float(new_track_thresh)
+        self.match_thresh = float(match_thresh)
+        self.track_buffer = int(track_buffer)
+        self.fuse_score = fuse_score
+        self.kalman = KalmanBoxFilter()
+        self.reset()
+
+    def reset(self):
+        self.mean = np.zeros((0, 8))
+        self.covariance = np.zeros((0, 8, 8))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.classes = np.zeros(0, dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.confirmed = np.zeros(0, dtype=bool)
+        self.lost = np.zeros(0, dtype=bool)
+        self.last_frame = np.zeros(0, dtype=np.int64)
+        self.frame_id = 0
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _associate(self, tracks: np.ndarray, detections: np.ndarray, boxes: np.ndarray, scores: np.ndarray,
+                   thresh: float, fuse: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Optimal IoU assignment between track and detection indices, returns matched pairs (M x 2)
+        and the unmatched track and detection indices.
+        '''
+        if len(tracks) == 0 or len(detections) == 0:
+            return np.zeros((0, 2), dtype=np.int64), tracks, detections
+        similarity = box_iou(xyah_to_xyxy(self.mean[tracks, :4]), boxes[detections])
+        if fuse:
+            similarity = similarity * scores[detections][None, :]
+        cost = 1 - similarity
+        rows, cols = linear_sum_assignment(cost)
+        keep = cost[rows, cols] <= thresh
+        rows, cols = rows[keep], cols[keep]
+        matches = np.stack((tracks[rows], detections[cols]), axis=1)
+        return matches, np.delete(tracks, rows), np.delete(detections, cols)
+
+    def update(self, detections: np.ndarray, frame: Optional[np.ndarray] = None) -> Optional[Tracks]:
+        '''
+        Advance all tracks by one frame and associate the detections, returns the confirmed tracks seen
+        on this frame or None. frame is accepted for interface parity with DetectionTracker and unused.
+        '''
+        self.frame_id += 1
+        detections = np.asarray(detections, dtype=np.float32).reshape(-1, 6)
+        boxes, scores = detections[:, :4], detections[:, 4]
+        high = np.flatnonzero(scores >= self.high_thresh)
+        low = np.flatnonzero((scores > self.low_thresh) & (scores < self.high_thresh))
+
+        if len(self):
+            self.mean[self.lost, 7] = 0
+            self.mean, self.covariance = self.kalman.predict(self.mean, self.covariance)
+
+        matched_high, remaining, unmatched_high = self._associate(
+            np.flatnonzero(self.confirmed), high, boxes, scores, self.match_thresh, self.fuse_score
+        )
+        matched_low, unmatched_tracked, _ = self._associate(
+            remaining[~self.lost[remaining]], low, boxes, scores, 0.5, False
+        )
+        matched_new, unmatched_new, unmatched_high = self._associate(
+            np.flatnonzero(~self.confirmed), unmatched_high, boxes, scores, 0.7, self.fuse_score
+        )
+
+        matches = np.concatenate((matched_high, matched_low, matched_new))
+        if len(matches):
+            tracks, dets = matches[:, 0], matches[:, 1]
+            self.mean[tracks], self.covariance[tracks] = self.kalman.update(
+                self.mean[tracks], self.covariance[tracks], xyxy_to_xyah(boxes[dets])
+            )
+            self.classes[tracks] = detections[dets, 5]
+            self.scores[tracks] = scores[dets]
+            self.confirmed[tracks] = True
+            self.lost[tracks] = False
+            self.last_frame[tracks] = self.frame_id
+        self.lost[unmatched_tracked] = True
+
+        keep = np.ones(len(self), dtype=bool)
+        keep[unmatched_new] = False
+        keep &= ~(self.lost & (self.frame_id - self.last_frame > self.track_buffer))
+        self._compact(keep)
+
+        new = unmatched_high[scores[unmatched_high] >= self.new_track_thresh]
+        if len(new):
+            self._start(detections[new])
+
+        visible = np.flatnonzero(self.confirmed & ~self.lost & (self.last_frame == self.frame_id))
+        if len(visible) == 0:
+            return None
+        return xyah_to_xyxy(self.mean[visible, :4]).astype(np.float32), self.ids[visible].copy(), self.classes[visible].copy()
+
+    def _compact(self, keep: np.ndarray):
+        if keep.all():
+            return
+        self.mean, self.covariance = self.mean[keep], self.covariance[keep]
+        self.ids, self.classes, self.scores = self.ids[keep], self.classes[keep], self.scores[keep]
+        self.confirmed, self.lost, self.last_frame = self.confirmed[keep], self.lost[keep], self.last_frame[keep]
+
+    def _start(self, detections: np.ndarray):
+        count = len(detections)
+        mean, covariance = self.kalman.initiate(xyxy_to_xyah(detections[:, :4]))
+        self.mean = np.concatenate((self.mean, mean))
+        self.covariance = np.concatenate((self.covariance, covariance))
+        self.ids = np.concatenate((self.ids, np.arange(self.next_id, self.next_id + count, dtype=np.int64)))
+        self.classes = np.concatenate((self.classes, detections[:, 5]))
+        self.scores = np.concatenate((self.scores, detections[:, 4]))
+        self.confirmed = np.concatenate((self.confirmed, np.full(count, self.frame_id == 1)))
+        self.lost = np.concatenate((self.lost, np.zeros(count, dtype=bool)))
+        self.last_frame = np.concatenate((self.last_frame, np.full(count, self.frame_id, dtype=np.int64)))
+        self.next_id += count
+
+    def get_stats(self):
+        return {
+            "tracks": int((self.confirmed & ~self.lost).sum()),
+            "lost": int(self.lost.sum()),
+            "tentative": int((~self.confirmed).sum()),
+        }
@@ -1,15 +1,25 @@
-from typing import List, Dict, Tuple, Any
+import time
+import numpy as np
+from typing import Dict, Tuple, Any, Optional
 from config_manager import ConfigManager
-from socket_types import PayloadKeys
+from socket_types import PayloadKeys, ConfigKeys
+from counting_zones import CountingZones
+from track_store import TrackStore
+from count_aggregator import count_aggregator
 
 class ObjectCounter:
+    '''
+    Counts tracks whose box center lies inside the counting band and follows the lowest track as the
+    target object, flagging an upload once it passes upload_threshold. Counting takes the xyxy boxes,
+    ids and classes arrays straight from the tracker and works on whole arrays per frame.
+    '''
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
         self.counting_region_bottom: int = 0
         self.counting_region_top: int = 0
-        self.names: List[str] = []
+        self.names: Dict[int, str] = {}
         self.total_counts: Dict[str, int] = {}
-        self.counting_list: set = set()
+        self.tracks = TrackStore()
         self.last_seen: int = 0
         self.upload: bool = False
         self.target_object: Dict[str, Any] = {}
@@ -20,95 +30,125 @@ class ObjectCounter:
         self.upload_threshold: int = 0
         self.collected_total: int = 0
         self.resolution: Tuple[int, int] = (640, 480)
+        self.zones: Optional[CountingZones] = None
+        self.zone_config: Any = None
 
     async def init_config(self):
+        await self.configure()
+        self.total_counts = {name: 0 for name in self.names.values()}
+
+    async def configure(self):
         self.resolution = self.config_manager.get(PayloadKeys.RESOLUTION, (640, 480))
         self.counting_region_bottom = int(self.resolution[1] * (self.config_manager.get("counting_region_bottom", 25) / 100))
         self.counting_region_top = int(self.resolution[1] * (self.config_manager.get("counting_region_top", 75) / 100))
         self.miss_threshold = self.config_manager.get("miss_threshold", 40)
         self.counter_miss_condition = self.config_manager.get("counter_miss_condition", 5)
         self.upload_threshold = self.config_manager.get("upload_threshold", 20)
-        self.total_counts = {name: 0 for name in self.names}
-
-    async def start_counting(self, boxes: List[List[float]], ids: List[int], classes: List[int]):
+        self.names = {int(k): v for k, v in (self.config_manager.get(ConfigKeys.names, {}) or {}).items()}
+        capacity = int(self.config_manager.get(ConfigKeys.track_store_capacity, 1024))
+        if capacity != self.tracks.capacity:
+            self.tracks = TrackStore(capacity)
+        self.tracks.ttl = int(self.config_manager.get(ConfigKeys.track_ttl, 900))
+        count_aggregator.configure(
+            float(self.config_manager.get(ConfigKeys.count_bucket_seconds, 60)),
+            float(self.config_manager.get(ConfigKeys.count_rollup_seconds, 3600)),
+        )
+        zones = self.config_manager.get(ConfigKeys.counting_zones, []) or []
+        if (zones, list(self.resolution)) != self.zone_config:
+            self.zone_config = (zones, list(self.resolution))
+            self.zones = CountingZones(zones, self.resolution) if zones else None
+
+    def start_counting(self, boxes: np.ndarray, ids: np.ndarray, classes: np.ndarray, timestamp: Optional[float] = None):
         if len(boxes) == 0:
             self.target_object = {}
             return
-        await self.process_output(boxes, ids, classes)
+        self.process_output(np.asarray(boxes), np.asarray(ids, dtype=np.int64), np.asarray(classes), timestamp or time.time())
 
-    async def process_output(self, boxes: List[List[float]], track_ids: List[int], classes: List[int]):
+    def process_output(self, boxes: np.ndarray, track_ids: np.ndarray, classes: np.ndarray, timestamp: float):
         self.frame_counter += 1
         try:
+            centers = self.calculate_box_centers(boxes)
+            slots, known = self.tracks.observe(track_ids)
             if "id" not in self.target_object or self.target_object["id"] is None:
-                self.target_object = await self.find_lowest_object(boxes, track_ids)
+                self.target_object = self.find_lowest_object(centers, track_ids)
 
-            for box, track_id, cls in zip(boxes, track_ids, classes):
-                center_x, center_y = await self.calculate_box_center(box)
+            if self.zones:
+                self.tracks.inside[slots] = self.zones.update(centers, classes, self.tracks.positions[slots], self.tracks.inside[slots], known)
+            self.tracks.positions[slots] = centers
 
-                if self.counting_region_top < center_y < self.counting_region_bottom:
-                    await self.update_counting_list(track_id, cls)
+            center_y = centers[:, 1]
+            in_band = (self.counting_region_top < center_y) & (center_y < self.counting_region_bottom)
+            new = in_band & ~self.tracks.counted[slots]
+            if new.any():
+                self.update_counts(classes[new], timestamp)
+                self.tracks.counted[slots[new]] = True
 
-                if track_id == self.target_object["id"]:
-                    self.last_seen = self.frame_counter
-                    self.target_object["box"] = [center_x, center_y]
+            target = np.flatnonzero(track_ids == self.target_object["id"])
+            if len(target):
+                self.last_seen = self.frame_counter
+                self.target_object["box"] = centers[target[-1]].tolist()
 
-                if center_y < self.upload_threshold:
-                    self.counting_list.discard(track_id)
+            self.tracks.counted[slots[center_y < self.upload_threshold]] = False
         except Exception as e:
             raise Exception(f"Error processing output: {e}") from e
-        
-        await self.manage_target_object(boxes, track_ids)
+
+        self.manage_target_object(centers, track_ids)
 
     @staticmethod
-    async def calculate_box_center(box: List[float]) -> Tuple[int, int]:
-        center_x = int((box[0] + box[2]) / 2)
-        center_y = int((box[1] + box[3]) / 2)
-        return center_x, center_y
-
-    async def update_counting_list(self, track_id: int, cls: int):
-        if track_id not in self.counting_list:
-            self.counting_list.add(track_id)
-            class_name = self.names[cls]
-            self.total_counts[class_name] = self.total_counts.get(class_name, 0) + 1
-            self.collected_total += 1
-
-    async def manage_target_object(self, boxes: List[List[float]], track_ids: List[int]):
+    def calculate_box_centers(boxes: np.ndarray) -> np.ndarray:
+        '''
+        Integer box centers, truncated towards zero like int().
+        '''
+        return ((boxes[:, :2] + boxes[:, 2:4]) / 2).astype(np.int64)
+
+    def update_counts(self, classes: np.ndarray, timestamp: float):
+        count_aggregator.add(timestamp, classes)
+        values, counts = np.unique(classes.astype(np.int64), return_counts=True)
+        for cls, count in zip(values.tolist(), counts.tolist()):
+            class_name = self.names.get(cls, str(cls))
+            self.total_counts[class_name] = self.total_counts.get(class_name, 0) + count
+        self.collected_total += len(classes)
+
+    def manage_target_object(self, centers: np.ndarray, track_ids: np.ndarray):
         if self.frame_counter - self.last_seen > self.counter_miss_condition:
             self.miss_counter += 1
             if self.miss_counter > self.miss_threshold:
-                self.target_object = await self.find_lowest_object(boxes, track_ids)
+                self.target_object = self.find_lowest_object(centers, track_ids)
                 self.miss_counter = 0
                 self.frame_counter = 0
         elif self.target_object["id"] is None:
-            self.target_object = await self.find_lowest_object(boxes, track_ids)
+            self.target_object = self.find_lowest_object(centers, track_ids)
         elif self.target_object["box"][1] <= self.upload_threshold:
-            self.target_object = await self.find_lowest_object(boxes, track_ids)
+            self.target_object = self.find_lowest_object(centers, track_ids)
             self.upload = True
             self.miss_counter = 0
 
-    async def find_lowest_object(self, boxes: List[List[float]], track_ids: List[int]) -> Dict[str, Any]:
-        lowest_object = {"id": None, "box": [0, 0]}
-        for box, track_id in zip(boxes, track_ids):
-            x, y = await self.calculate_box_center(box)
-            if y > lowest_object["box"][1]:
-                lowest_object = {"id": track_id, "box": [x, y]}
-        return lowest_object
+    @staticmethod
+    def find_lowest_object(centers: np.ndarray, track_ids: np.ndarray) -> Dict[str, Any]:
+        if len(centers) == 0:
+            return {"id": None, "box": [0, 0]}
+        lowest = int(np.argmax(centers[:, 1]))
+        if centers[lowest, 1] <= 0:
+            return {"id": None, "box": [0, 0]}
+        return {"id": track_ids[lowest].item(), "box": centers[lowest].tolist()}
 
     async def clear(self):
-        self.total_counts = {name: 0 for name in self.names}
+        self.total_counts = {name: 0 for name in self.names.values()}
         self.collected_total = 0
-
-    async def start_counting(self, boxes: List[List[float]], ids: List[int], clss: List[int]):
-        if len(boxes) == 0:
-            self.target_object = {}
-            return
-        await self.process_output(boxes, ids, clss)
+        if self.zones:
+            self.zones.clear()
 
     def get_counts(self) -> Dict[str, int]:
         return self.total_counts
 
+    def get_zone_counts(self) -> Optional[Dict[str, Dict[str, Dict[str, int]]]]:
+        return self.zones.get_counts(self.names) if self.zones else None
+
+    def get_track_stats(self) -> Dict[str, int]:
+        return self.tracks.get_stats()
+
     def should_upload(self) -> bool:
         return self.upload
 
     def reset_upload_flag(self):
-        self.upload = False
\ No newline at end of file
+        self.upload = False
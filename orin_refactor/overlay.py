@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+from counting_zones import CountingZones
+
+class OverlayRenderer:
+    '''
+    Draws tracked boxes, track ids, the counting band and counting zones in place on a frame that is
+    already scaled for output, mapping coordinates from the source resolution. Only what the viewer
+    needs is drawn, no labels, masks or frame copies, and the band lines are scaled once per size.
+    '''
+    def __init__(self, box_color: Tuple[int, int, int] = (255, 0, 0), band_color: Tuple[int, int, int] = (0, 255, 0), thickness: int = 2):
+        self.box_color = box_color
+        self.band_color = band_color
+        self.thickness = thickness
+        self.band: Tuple[int, int] = (0, 0)
+        self.source_size: Tuple[int, int] = (0, 0)
+        self.cache_key: Optional[Tuple] = None
+        self.band_lines: Tuple[int, ...] = ()
+
+    def set_band(self, top: int, bottom: int, source_size: Tuple[int, int]):
+        '''
+        The counting band in source pixels and the source resolution the tracks refer to.
+        '''
+        self.band = (int(top), int(bottom))
+        self.source_size = (int(source_size[0]), int(source_size[1]))
+
+    def _band_lines(self, size: Tuple[int, int]) -> Tuple[int, ...]:
+        key = (size, self.band, self.source_size)
+        if key != self.cache_key:
+            scale = size[1] / self.source_size[1] if self.source_size[1] else 1
+            self.band_lines = tuple(int(round(y * scale)) for y in self.band)
+            self.cache_key = key
+        return self.band_lines
+
+    def draw(self, image: np.ndarray, boxes: Optional[np.ndarray] = None, track_ids: Optional[np.ndarray] = None,
+             zones: Optional[CountingZones] = None):
+        height, width = image.shape[:2]
+        if self.source_size[0] and (width, height) != self.source_size:
+            scale = np.array([width / self.source_size[0], height / self.source_size[1]] * 2, dtype=np.float32)
+        else:
+            scale = None
+        font_scale = max(width / 1600, 0.4)
+        if boxes is not None and len(boxes):
+            boxes = np.asarray(boxes, dtype=np.float32)[:, :4]
+            boxes = (boxes * scale if scale is not None else boxes).astype(np.int32)
+            for (x1, y1, x2, y2), track_id in zip(boxes.tolist(), track_ids.tolist()):
+                cv2.rectangle(image, (x1, y1), (x2, y2), self.box_color, self.thickness)
+                cv2.putText(image, str(track_id), (x1, max(y1 - 4, 0)), cv2.FONT_HERSHEY_SIMPLEX, font_scale, self.box_color, self.thickness)
+        for y in self._band_lines((width, height)):
+            cv2.line(image, (0, y), (width, y), self.band_color, self.thickness)
+        if zones:
+            zones.draw(image, scale=(scale[0], scale[1]) if scale is not None else (1, 1))
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+import cv2
+import numpy as np
+from aiohttp import web
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+BOUNDARY = "frame"
+
+INDEX_PAGE = '''<!DOCTYPE html>
+<html><head><title>Camera preview</title></head>
+<body style="margin:0;background:#000"><img src="/stream.mjpg" style="width:100%;height:auto"></body></html>
+'''
+
+class PreviewServer:
+    '''
+    Local MJPEG preview over HTTP for aiming and focusing the camera on the site LAN without the
+    RTMP pipeline or uplink bandwidth. Each published frame is encoded to JPEG once, off the event
+    loop, and the same bytes go to every subscriber; a slow client simply skips to the latest frame.
+    Frames are only encoded while someone is watching and at most fps times a second.
+    '''
+    def __init__(self):
+        self.logger = logging.getLogger("app")
+        self.runner: Optional[web.AppRunner] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview-encoder")
+        self.condition = asyncio.Condition()
+        self.settings: tuple = ()
+        self.fps: float = 5
+        self.quality: int = 70
+        self.width: int = 640
+        self.jpeg: Optional[bytes] = None
+        self.sequence: int = 0
+        self.subscribers: int = 0
+        self.waiting: int = 0
+        self.encoding: bool = False
+        self.next_frame_time: float = 0.0
+        self.encoded: int = 0
+        self.encode_time: float = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.runner is not None
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8080, fps: float = 5, quality: int = 70, width: int = 640):
+        '''
+        Start serving, or restart when the address changed. Encoding settings apply immediately.
+        '''
+        self.fps = max(float(fps), 0.1)
+        self.quality = min(max(int(quality), 1), 100)
+        self.width = int(width)
+        if self.runner and self.settings == (host, port):
+            return
+        await self.stop()
+        app = web.Application()
+        app.router.add_get("/", self._index)
+        app.router.add_get("/stream.mjpg", self._mjpeg)
+        app.router.add_get("/snapshot.jpg", self._snapshot)
+        runner = web.AppRunner(app, handle_signals=False)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, int(port)).start()
+        except Exception:
+            await runner.cleanup()
+            raise
+        self.runner = runner
+        self.settings = (host, port)
+        self.logger.info(f"Preview server listening on http://{host}:{port}/")
+
+    async def stop(self):
+        if not self.runner:
+            return
+        runner, self.runner = self.runner, None
+        async with self.condition:
+            self.condition.notify_all()
+        await runner.cleanup()
+        self.settings = ()
+        self.logger.info("Preview server stopped")
+
+    def wants_frame(self, now: Optional[float] = None) -> bool:
+        '''
+        True when a frame published now would be encoded, so callers can skip drawing overlays otherwise.
+        '''
+        if not self.runner or self.encoding or not (self.subscribers or self.waiting):
+            return False
+        return (now or time.monotonic()) >= self.next_frame_time
+
+    def publish(self, frame: np.ndarray, overlay: Optional[Callable[[np.ndarray], None]] = None) -> bool:
+        '''
+        Hand a frame to the encoder if one is wanted, returns True when it was taken.
+        overlay draws in place on the scaled copy.
+        '''
+        now = time.monotonic()
+        if not self.wants_frame(now):
+            return False
+        self.next_frame_time = max(self.next_frame_time + 1 / self.fps, now)
+        height, width = frame.shape[:2]
+        if 0 < self.width < width:
+            size = (self.width, round(height * self.width / width))
+            image = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            image = frame.copy()
+        if overlay:
+            overlay(image)
+        self.encoding = True
+        asyncio.get_running_loop().create_task(self._encode(image))
+        return True
+
+    def _jpeg(self, image: np.ndarray) -> bytes:
+        start = time.perf_counter()
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        elapsed = time.perf_counter() - start
+        self.encode_time = elapsed if self.encode_time == 0 else 0.9 * self.encode_time + 0.1 * elapsed
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    async def _encode(self, image: np.ndarray):
+        try:
+            jpeg = await asyncio.get_running_loop().run_in_executor(self.executor, self._jpeg, image)
+        except Exception as e:
+            self.logger.error(f"Error encoding preview frame: {e}")
+            return
+        finally:
+            self.encoding = False
+        async with self.condition:
+            self.jpeg = jpeg
+            self.sequence += 1
+            self.encoded += 1
+            self.condition.notify_all()
+
+    async def _next_frame(self, seen: int) -> Optional[bytes]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.sequence != seen or not self.runner)
+            return self.jpeg if self.runner else None
+
+    async def _index(self, request: web.Request) -> web.Response:
+        return web.Response(text=INDEX_PAGE, content_type="text/html")
+
+    async def _snapshot(self, request: web.Request) -> web.Response:
+        self.waiting += 1
+        try:
+            jpeg = await asyncio.wait_for(self._next_frame(self.sequence), 5)
+        except asyncio.TimeoutError:
+            jpeg = None
+        finally:
+            self.waiting -= 1
+        if jpeg is None:
+            raise web.HTTPServiceUnavailable(text="No frames available")
+        return web.Response(body=jpeg, content_type="image/jpeg", headers={"Cache-Control": "no-store"})
+
+    async def _mjpeg(self, request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": f"multipart/x-mixed-replace; boundary={BOUNDARY}",
+            "Cache-Control": "no-store",
+        })
+        await response.prepare(request)
+        self.subscribers += 1
+        self.logger.info(f"Preview subscriber connected from {request.remote} ({self.subscribers} watching)")
+        seen = self.sequence
+        try:
+            while True:
+                jpeg = await self._next_frame(seen)
+                if jpeg is None:
+                    break
+                seen = self.sequence
+                await response.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n"
+                )
+        except ConnectionResetError:
+            pass
+        finally:
+            self.subscribers -= 1
+            self.logger.info(f"Preview subscriber disconnected ({self.subscribers} watching)")
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "subscribers": self.subscribers,
+            "encoded": self.encoded,
+            "encode_time": round(self.encode_time, 4),
+            "frame_bytes": len(self.jpeg) if self.jpeg else 0,
+        }
+
+preview_server = PreviewServer()
@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+import cv2
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class ReplayPacing:
+    REALTIME = "realtime"
+    MAX = "max"
+
+class ReplaySource(ABC):
+    '''
+    Base class for recorded sources. Mimics the parts of cv2.VideoCapture used by CaptureManager,
+    so every tracking mode runs unchanged on top of a replay.
+    Frame timestamps are derived from the frame index and fps, so repeated runs are deterministic.
+    '''
+    def __init__(self, path: str, resolution: Tuple[int, int], fps: Optional[float] = None,
+                 pacing: str = ReplayPacing.REALTIME, loop: bool = False):
+        self.logger = logging.getLogger("app")
+        self.path = path
+        self.resolution = (int(resolution[0]), int(resolution[1]))
+        self.fps: float = float(fps) if fps else 0.0
+        self.pacing = pacing
+        self.loop = loop
+        self.frame_index: int = 0
+        self.finished: bool = False
+        self.start_time: Optional[float] = None
+
+    @staticmethod
+    def is_replay(source) -> bool:
+        if not isinstance(source, str) or source.startswith('/dev/') or '://' in source:
+            return False
+        return os.path.isdir(source) or os.path.isfile(source)
+
+    @staticmethod
+    def open(source: str, resolution: Tuple[int, int], fps: Optional[float] = None,
+             pacing: str = ReplayPacing.REALTIME, loop: bool = False) -> "ReplaySource":
+        if os.path.isdir(source):
+            return ImageDirectorySource(source, resolution, fps, pacing, loop)
+        return VideoFileSource(source, resolution, fps, pacing, loop)
+
+    @property
+    def timestamp(self) -> float:
+        '''
+        Deterministic timestamp in seconds of the last frame returned by read().
+        '''
+        return max(self.frame_index - 1, 0) / self.fps
+
+    @abstractmethod
+    def _read_next(self, image: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        ...
+
+    def _rewind(self) -> bool:
+        return False
+
+    def _pace(self):
+        if self.pacing != ReplayPacing.REALTIME:
+            return
+        now = time.monotonic()
+        if self.start_time is None:
+            self.start_time = now
+        delay = self.start_time + self.frame_index / self.fps - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def _fit(self, frame: np.ndarray, image: Optional[np.ndarray]) -> np.ndarray:
+        '''
+        Resize to the configured resolution, reusing the caller's buffer when its shape allows it.
+        '''
+        width, height = self.resolution
+        target = image if image is not None and image.shape == (height, width, 3) else None
+        if frame.shape[1] == width and frame.shape[0] == height:
+            if target is None or target is frame:
+                return frame
+            np.copyto(target, frame)
+            return target
+        return cv2.resize(frame, (width, height), dst=target, interpolation=cv2.INTER_AREA)
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if self.finished:
+            return False, None
+        self._pace()
+        ret, frame = self._read_next(image)
+        if not ret and self.loop and self._rewind():
+            ret, frame = self._read_next(image)
+        if not ret:
+            self.finished = True
+            self.logger.info(f"Replay of {self.path} finished after {self.frame_index} frames")
+            return False, None
+        self.frame_index += 1
+        return True, self._fit(frame, image)
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_index)
+        if prop_id == cv2.CAP_PROP_POS_MSEC:
+            return self.timestamp * 1000
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.resolution[0])
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.resolution[1])
+        return 0.0
+
+    def set(self, prop_id: int, value) -> bool:
+        return False
+
+    def isOpened(self) -> bool:
+        return not self.finished
+
+    def release(self):
+        self.finished = True
+
+class VideoFileSource(ReplaySource):
+    def __init__(self, path: str, resolution: Tuple[int, int], fps: Optional[float] = None,
+                 pacing: str = ReplayPacing.REALTIME, loop: bool = False):
+        super().__init__(path, resolution, fps, pacing, loop)
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise Exception(f"Could not open video file {path}")
+        if not self.fps:
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.logger.info(f"Replaying video {path} at {self.fps} fps, pacing {self.pacing}")
+
+    def _read_next(self, image: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.cap.read()
+
+    def _rewind(self) -> bool:
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        super().release()
+        self.cap.release()
+
+class ImageDirectorySource(ReplaySource):
+    def __init__(self, path: str, resolution: Tuple[int, int], fps: Optional[float] = None,
+                 pacing: str = ReplayPacing.REALTIME, loop: bool = False):
+        super().__init__(path, resolution, fps, pacing, loop)
+        self.files: List[str] = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise Exception(f"No images found in {path}")
+        if not self.fps:
+            self.fps = 30.0
+        self.position: int = 0
+        self.logger.info(f"Replaying {len(self.files)} images from {path} at {self.fps} fps, pacing {self.pacing}")
+
+    def _read_next(self, image: Optional[np.ndarray]) -> Tuple[bool, Optional[np.ndarray]]:
+        while self.position < len(self.files):
+            file_name = self.files[self.position]
+            self.position += 1
+            frame = cv2.imread(file_name, cv2.IMREAD_COLOR)
+            if frame is not None:
+                return True, frame
+            self.logger.warning(f"Skipping unreadable image {file_name}")
+        return False, None
+
+    def _rewind(self) -> bool:
+        self.position = 0
+        return True
@@ -0,0 +1,96 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from inference_scheduler import Tracks
+from inference_backend import InferenceBackend, DetectionTracker, nms
+
+Rect = Tuple[int, int, int, int]
+
+class RoiMode:
+    FULL = "full"
+    CROP = "crop"
+    TILED = "tiled"
+
+def band_rect(shape: Tuple[int, int], top: float, bottom: float, margin: float) -> Rect:
+    '''
+    Full-width rectangle (x0, y0, x1, y1) around the counting band, top/bottom/margin in percent of the height.
+    '''
+    height, width = shape
+    y0 = int(max(min(top, bottom) - margin, 0) / 100 * height)
+    y1 = int(np.ceil(min(max(top, bottom) + margin, 100) / 100 * height))
+    return 0, y0, width, max(y1, y0 + 1)
+
+def tile_rects(rect: Rect, tile_size: int, overlap: float) -> List[Rect]:
+    '''
+    Evenly spaced tiles of at most tile_size covering rect, neighbours overlap by about overlap * tile_size.
+    '''
+    x0, y0, x1, y1 = rect
+    def starts(start: int, length: int) -> List[int]:
+        if length <= tile_size:
+            return [start]
+        step = max(int(tile_size * (1 - overlap)), 1)
+        count = int(np.ceil((length - tile_size) / step)) + 1
+        return [start + int(round(i * (length - tile_size) / (count - 1))) for i in range(count)]
+    tile_w, tile_h = min(tile_size, x1 - x0), min(tile_size, y1 - y0)
+    return [(x, y, x + tile_w, y + tile_h) for y in starts(y0, y1 - y0) for x in starts(x0, x1 - x0)]
+
+class RoiInference:
+    '''
+    Runs the model on the counting band instead of the whole frame and maps detections back to
+    full-frame coordinates. In crop mode the band goes through the backend's own tracker when it has
+    one. In tiled mode the band is split into overlapping tiles, the tiles are detected as one batch,
+    merged with NMS and associated by the detection tracker, since tracking cannot span tiles.
+    '''
+    def __init__(self, mode: str = RoiMode.CROP, margin: float = 10, tile_size: int = 640, overlap: float = 0.2, iou_threshold: float = 0.5):
+        self.mode = mode
+        self.margin = float(margin)
+        self.tile_size = int(tile_size)
+        self.overlap = float(overlap)
+        self.iou_threshold = float(iou_threshold)
+        self.band: Tuple[float, float] = (25, 75)
+        self.shape: Optional[Tuple[int, int]] = None
+        self.rect: Rect = (0, 0, 0, 0)
+        self.tiles: List[Rect] = []
+
+    def set_band(self, top: float, bottom: float):
+        if (top, bottom) != self.band:
+            self.band = (top, bottom)
+            self.shape = None
+
+    def _layout(self, shape: Tuple[int, int]):
+        if shape == self.shape:
+            return
+        self.rect = band_rect(shape, self.band[0], self.band[1], self.margin)
+        self.tiles = tile_rects(self.rect, self.tile_size, self.overlap)
+        self.shape = shape
+
+    def run(self, backend: InferenceBackend, tracker: DetectionTracker, frame: np.ndarray, conf: float) -> Optional[Tracks]:
+        self._layout(frame.shape[:2])
+        if self.mode == RoiMode.CROP and backend.can_track:
+            x0, y0, x1, y1 = self.rect
+            tracks, _ = backend.track(frame[y0:y1, x0:x1], conf)
+            if tracks is None:
+                return None
+            boxes, track_ids, classes = tracks
+            boxes[:, [0, 2]] += x0
+            boxes[:, [1, 3]] += y0
+            return boxes, track_ids, classes
+
+        return tracker.update(self.detect(backend, frame, conf), frame)
+
+    def detect(self, backend: InferenceBackend, frame: np.ndarray, conf: float) -> np.ndarray:
+        '''
+        Detections on the band in full-frame coordinates, merged across tiles.
+        '''
+        self._layout(frame.shape[:2])
+        tiles = [self.rect] if self.mode == RoiMode.CROP else self.tiles
+        detections = []
+        for (x0, y0, _, _), data in zip(tiles, backend.detect([frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles], conf)):
+            if len(data):
+                data = data.copy()
+                data[:, [0, 2]] += x0
+                data[:, [1, 3]] += y0
+                detections.append(data)
+        merged = np.concatenate(detections) if detections else np.zeros((0, 6), dtype=np.float32)
+        if len(tiles) > 1:
+            merged = merged[nms(merged[:, :4], merged[:, 4], merged[:, 5], self.iou_threshold)]
+        return merged
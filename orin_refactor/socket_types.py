@@ -27,6 +27,7 @@ class Topic(StrEnum):
     DEVICE_CONFIG = "config"
     AUTHENTICATION_RESULT = "authentication_result"
     CALIBRATION_RESULT = 'calibration_result'
+    CALIBRATION_PROGRESS = 'calibration_progress'
 
 class AuthenticationResult(StrEnum):
     SUCCESS = "true"
@@ -69,6 +70,26 @@ class PayloadKeys(StrEnum):
     RESOLUTION = 'resolution'
     STREAM_RESOLUTION= 'stream_resolution'
     CALIBRATION_RESULT = 'calibration_result'
+    FRAME = 'frame'
+    FRAME_LATENCY = 'frame_latency'
+    COUNT_LATENCY = 'count_latency'
+    DROPPED_FRAMES = 'dropped_frames'
+    MOTION_SCORE = 'motion_score'
+    MOTION_SCORES = 'motion_scores'
+    CALIBRATION_PROGRESS = 'calibration_progress'
+    CALIBRATING = 'calibrating'
+    INFERENCE = 'inference'
+    SCHEDULER = 'scheduler'
+    BACKEND = 'backend'
+    TRACKS = 'tracks'
+    ZONE_COUNTS = 'zone_counts'
+    TRACK_STORE = 'track_store'
+    COUNT_BUCKETS = 'count_buckets'
+    STREAM_STATS = 'stream_stats'
+    PREVIEW_STATS = 'preview_stats'
+    CLIPS = 'clips'
+    HTTP = 'http'
+    UPLOAD = 'upload'
     
 class ConfigKeys(StrEnum):
     upload_url = "upload_url"
@@ -85,21 +106,101 @@ class ConfigKeys(StrEnum):
     calibration_length = "calibration_length"
     counting_region_top = "counting_region_top"
     counting_region_bottom = "counting_region_bottom"
+    counting_zones = "counting_zones"
+    track_store_capacity = "track_store_capacity"
+    track_ttl = "track_ttl"
+    count_bucket_seconds = "count_bucket_seconds"
+    count_rollup_seconds = "count_rollup_seconds"
+    send_count_buckets = "send_count_buckets"
+    send_tracking_events = "send_tracking_events"
+    stream_queue_size = "stream_queue_size"
+    stream_fps = "stream_fps"
+    stream_pix_fmt = "stream_pix_fmt"
+    stream_bitrate = "stream_bitrate"
+    stream_output = "stream_output"
+    adaptive_stream = "adaptive_stream"
+    stream_profiles = "stream_profiles"
+    stream_adapt_interval = "stream_adapt_interval"
+    stream_downgrade_after = "stream_downgrade_after"
+    stream_upgrade_after = "stream_upgrade_after"
+    preview_enabled = "preview_enabled"
+    preview_host = "preview_host"
+    preview_port = "preview_port"
+    preview_fps = "preview_fps"
+    preview_quality = "preview_quality"
+    preview_width = "preview_width"
+    clip_pre_seconds = "clip_pre_seconds"
+    clip_post_seconds = "clip_post_seconds"
+    clip_fps = "clip_fps"
+    clip_quality = "clip_quality"
+    clip_width = "clip_width"
+    clip_buffer_mb = "clip_buffer_mb"
+    clip_max_seconds = "clip_max_seconds"
+    clip_codec = "clip_codec"
+    clip_on_motion = "clip_on_motion"
+    http_limit_per_host = "http_limit_per_host"
+    http_dns_ttl = "http_dns_ttl"
+    http_keepalive = "http_keepalive"
+    http_connect_timeout = "http_connect_timeout"
+    http_timeout = "http_timeout"
+    upload_format = "upload_format"
+    upload_quality = "upload_quality"
+    upload_encode_workers = "upload_encode_workers"
     cloud_function_url = "cloud_function_url"
     upload_threshold = "upload_threshold"
     miss_threshold = "miss_threshold"
     counter_miss_condition ="counter_miss_condition"
     stream = "stream"
     rtmp_url = "rtmp_url"
+    stream_key = "stream_key"
+    fps = "fps"
     resolution = "resolution"
     show_bboxes = "show_bboxes"
     conf_threshold = "conf_threshold"
     save_images = "save_images"
     save_videos = "save_videos"
+    save_dir = "save_dir"
     weights = "weights"
+    available_weights = "available_weights"
     max_no_motion_frames = "max_no_motion_frames"
     names = "names"
     telemetry_interval = "telemetry_interval"
+    threaded_capture = "threaded_capture"
+    capture_buffers = "capture_buffers"
+    replay_pacing = "replay_pacing"
+    replay_fps = "replay_fps"
+    replay_loop = "replay_loop"
+    replay_epoch = "replay_epoch"
+    motion_width = "motion_width"
+    motion_learning_rate = "motion_learning_rate"
+    motion_pixel_threshold = "motion_pixel_threshold"
+    motion_regions = "motion_regions"
+    motion_roi_margin = "motion_roi_margin"
+    calibration_percentile = "calibration_percentile"
+    calibration_source = "calibration_source"
+    apply_calibration = "apply_calibration"
+    inference_queue_size = "inference_queue_size"
+    inference_drop_policy = "inference_drop_policy"
+    adaptive_inference = "adaptive_inference"
+    inference_min_fps = "inference_min_fps"
+    inference_max_fps = "inference_max_fps"
+    inference_max_displacement = "inference_max_displacement"
+    inference_duty_cycle = "inference_duty_cycle"
+    inference_roi = "inference_roi"
+    inference_roi_margin = "inference_roi_margin"
+    inference_tile_size = "inference_tile_size"
+    inference_tile_overlap = "inference_tile_overlap"
+    inference_backend = "inference_backend"
+    inference_device = "inference_device"
+    inference_warmup_runs = "inference_warmup_runs"
+    preload_weights = "preload_weights"
+    model_memory_budget = "model_memory_budget"
+    tracker = "tracker"
+    track_high_thresh = "track_high_thresh"
+    track_low_thresh = "track_low_thresh"
+    new_track_thresh = "new_track_thresh"
+    track_match_thresh = "track_match_thresh"
+    track_buffer = "track_buffer"
     
     
 class Control(StrEnum):
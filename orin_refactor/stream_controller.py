@@ -0,0 +1,121 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+class StreamProfile:
+    __slots__ = ('name', 'width', 'height', 'fps', 'bitrate')
+
+    def __init__(self, name: str, width: int, height: int, fps: float, bitrate: int):
+        self.name = name
+        self.width = int(width) - int(width) % 2
+        self.height = int(height) - int(height) % 2
+        self.fps = float(fps)
+        self.bitrate = int(bitrate)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StreamProfile":
+        return cls(data.get("name", f"{data['width']}x{data['height']}"), data["width"], data["height"], data["fps"], data["bitrate"])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "width": self.width, "height": self.height, "fps": self.fps, "bitrate": self.bitrate}
+
+DEFAULT_PROFILES = [
+    StreamProfile("high", 1280, 720, 15, 1500),
+    StreamProfile("medium", 640, 360, 15, 800),
+    StreamProfile("low", 426, 240, 10, 400),
+    StreamProfile("minimal", 320, 180, 5, 200),
+]
+
+class StreamHealth:
+    __slots__ = ('written', 'dropped', 'write_latency', 'queue', 'speed')
+
+    def __init__(self, written: int = 0, dropped: int = 0, write_latency: float = 0.0, queue: int = 0, speed: Optional[float] = None):
+        self.written = written
+        self.dropped = dropped
+        self.write_latency = write_latency
+        self.queue = queue
+        self.speed = speed
+
+class StreamController:
+    '''
+    Steps the stream through a ladder of profiles, ordered from best to cheapest, based on the
+    writer's drop rate, pipe write latency and queue depth and on the encoder speed ffmpeg reports.
+    A window counts as congested when frames are dropped, writes take most of the frame interval or
+    ffmpeg falls behind real time, and as healthy when none of that comes close. The profile only
+    changes after downgrade_after congested or upgrade_after healthy windows in a row, since every
+    change restarts the encoder. The start profile is also the ceiling for upgrades.
+    '''
+    def __init__(self, profiles: List[StreamProfile], start: int = 0, downgrade_after: int = 3, upgrade_after: int = 10,
+                 max_drop_rate: float = 0.1, min_speed: float = 0.9):
+        self.logger = logging.getLogger("app")
+        self.profiles = profiles or DEFAULT_PROFILES
+        self.ceiling = min(max(int(start), 0), len(self.profiles) - 1)
+        self.index = self.ceiling
+        self.downgrade_after = max(int(downgrade_after), 1)
+        self.upgrade_after = max(int(upgrade_after), 1)
+        self.max_drop_rate = float(max_drop_rate)
+        self.min_speed = float(min_speed)
+        self.congested = 0
+        self.healthy = 0
+        self.previous: Optional[StreamHealth] = None
+        self.changes = 0
+
+    @property
+    def profile(self) -> StreamProfile:
+        return self.profiles[self.index]
+
+    def reset_window(self):
+        '''
+        Forget the counters of the last window, called after the encoder restarts.
+        '''
+        self.previous = None
+        self.congested = 0
+        self.healthy = 0
+
+    def classify(self, health: StreamHealth) -> Optional[bool]:
+        '''
+        True for a congested window, False for a healthy one and None for neither or no data yet.
+        '''
+        previous, self.previous = self.previous, health
+        if previous is None:
+            return None
+        written = max(health.written - previous.written, 0)
+        dropped = max(health.dropped - previous.dropped, 0)
+        if written + dropped == 0:
+            return None
+        drop_rate = dropped / (written + dropped)
+        interval = 1 / self.profile.fps if self.profile.fps > 0 else 0
+        slow_writes = interval > 0 and health.write_latency > 0.8 * interval
+        slow_encoder = health.speed is not None and health.speed < self.min_speed
+        if drop_rate > self.max_drop_rate or slow_writes or slow_encoder:
+            return True
+        quick_writes = interval == 0 or health.write_latency < 0.3 * interval
+        encoder_ok = health.speed is None or health.speed >= 0.98
+        if dropped == 0 and health.queue <= 1 and quick_writes and encoder_ok:
+            return False
+        return None
+
+    def update(self, health: StreamHealth) -> Optional[StreamProfile]:
+        '''
+        Feed one observation window, returns the new profile when the stream should switch.
+        '''
+        state = self.classify(health)
+        self.congested = self.congested + 1 if state is True else 0
+        self.healthy = self.healthy + 1 if state is False else 0
+        if self.congested >= self.downgrade_after and self.index < len(self.profiles) - 1:
+            self.index += 1
+        elif self.healthy >= self.upgrade_after and self.index > self.ceiling:
+            self.index -= 1
+        else:
+            return None
+        self.changes += 1
+        self.reset_window()
+        self.logger.info(f"Switching stream profile to {self.profile.name}")
+        return self.profile
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "profile": self.profile.name,
+            "changes": self.changes,
+            "congested_windows": self.congested,
+            "healthy_windows": self.healthy,
+        }
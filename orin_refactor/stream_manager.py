@@ -1,11 +1,23 @@
 import asyncio
 import logging
-from typing import Tuple
+import subprocess
+import threading
+import time
+import cv2
+import numpy as np
+from typing import Tuple, Optional, Dict, Any, Callable
 import ffmpeg
 from config_manager import ConfigManager
-from socket_types import PayloadKeys
+from socket_types import PayloadKeys, ConfigKeys
+from stream_writer import FrameWriter
+from stream_controller import StreamController, StreamProfile, StreamHealth, DEFAULT_PROFILES
 import os
 
+PIPE_FORMATS = {
+    'bgr24': None,
+    'yuv420p': cv2.COLOR_BGR2YUV_I420,
+}
+
 class StreamManager:
     def __init__(self, config_manager: ConfigManager):
         self.config_manager = config_manager
@@ -18,6 +30,21 @@ class StreamManager:
         self.rtmp_url: str = ""
         self.stream_key: str = ""
         self.device_id: str = ""
+        self.writer: Optional[FrameWriter] = None
+        self.queue_size: int = 2
+        self.stream_fps: float = 15
+        self.pix_fmt: str = 'bgr24'
+        self.next_frame_time: Optional[float] = None
+        self.scaled: Optional[np.ndarray] = None
+        self.skipped: int = 0
+        self.bitrate: int = 800
+        self.output_url: Optional[str] = None
+        self.controller: Optional[StreamController] = None
+        self.control_task: Optional[asyncio.Task] = None
+        self.control_interval: float = 2.0
+        self.progress: Dict[str, str] = {}
+        self.progress_thread: Optional[threading.Thread] = None
+        self.switching: bool = False
 
     async def initialize(self):
         self.input_resolution = tuple(self.config_manager.get(PayloadKeys.RESOLUTION, [1920, 1080]))
@@ -25,9 +52,36 @@ class StreamManager:
         self.frame_rate = self.config_manager.get(PayloadKeys.FPS, 30)
         self.rtmp_url = self.config_manager.get("rtmp_url", "")
         self.stream_key = self.config_manager.get("stream_key", "")
+        self.queue_size = int(self.config_manager.get(ConfigKeys.stream_queue_size, 2))
+        self.stream_fps = float(self.config_manager.get(ConfigKeys.stream_fps, self.frame_rate) or self.frame_rate)
+        self.pix_fmt = self.config_manager.get(ConfigKeys.stream_pix_fmt, 'bgr24')
+        if self.pix_fmt not in PIPE_FORMATS:
+            self.logger.warning(f"Unsupported stream pipe format {self.pix_fmt}, using bgr24")
+            self.pix_fmt = 'bgr24'
+        self.bitrate = int(self.config_manager.get(ConfigKeys.stream_bitrate, 800))
+        self.output_url = self.config_manager.get(ConfigKeys.stream_output, None)
+        width, height = self.output_resolution
+        self.output_resolution = (width - width % 2, height - height % 2)
+        self.controller = None
+        if self.config_manager.get(ConfigKeys.adaptive_stream, False):
+            profiles = [StreamProfile.from_dict(profile) for profile in self.config_manager.get(ConfigKeys.stream_profiles, []) or []] or DEFAULT_PROFILES
+            start = next((i for i, profile in enumerate(profiles) if profile.width <= self.output_resolution[0]), len(profiles) - 1)
+            self.controller = StreamController(
+                profiles,
+                start,
+                int(self.config_manager.get(ConfigKeys.stream_downgrade_after, 3)),
+                int(self.config_manager.get(ConfigKeys.stream_upgrade_after, 10)),
+            )
+            self.control_interval = float(self.config_manager.get(ConfigKeys.stream_adapt_interval, 2))
+            self._apply_profile(self.controller.profile)
         self.device_id = os.getenv("DEVICE_ID")
         self.logger.info(f"Initialized StreamManager with output URL: {self.rtmp_url}{self.device_id}")
 
+    def _apply_profile(self, profile: StreamProfile):
+        self.output_resolution = (profile.width, profile.height)
+        self.stream_fps = profile.fps
+        self.bitrate = profile.bitrate
+
     async def start_stream(self):
         if self.stream_active:
             self.logger.warning("Stream is already active")
@@ -35,93 +89,257 @@ class StreamManager:
         self.logger.info("Starting stream")
 
         try:
-            input_args = {
-                'format': 'rawvideo',
-                'pix_fmt': 'bgr24',
-                's': f'{self.input_resolution[0]}x{self.input_resolution[1]}',
-                'framerate': f'{self.frame_rate}',
-            }
-
-            output_args = {
-                'format': 'flv',
-                'vcodec': 'libx264',
-                'video_bitrate': '800k',
-                'maxrate': '1000k',
-                'bufsize': '2000k',
-                'framerate': self.frame_rate,
-                's': f'{self.output_resolution[0]}x{self.output_resolution[1]}',
-                'preset': 'veryfast',
-                'tune': 'zerolatency',
-                'g': '30',
-                'pix_fmt': 'yuv420p',
-            }
-
-            stream_url = f"{self.rtmp_url}{self.device_id}?key={self.stream_key}"
-
-            process = (
-                ffmpeg
-                .input('pipe:', **input_args)
-                .output(stream_url, **output_args)
-                .overwrite_output()
-                .global_args('-loglevel', 'error')
-                .run_async(pipe_stdin=True)
-            )
-
-            self.process = process
+            self._start_encoder()
             self.stream_active = True
+            if self.controller:
+                self.control_task = asyncio.create_task(self._control_loop())
             self.logger.info("Stream started successfully")
         except Exception as e:
             self.logger.error(f"Failed to start stream: {e}")
             self.stream_active = False
             raise
 
+    def _start_encoder(self):
+        input_args = {
+            'format': 'rawvideo',
+            'pix_fmt': self.pix_fmt,
+            's': f'{self.output_resolution[0]}x{self.output_resolution[1]}',
+            'framerate': f'{self.stream_fps:g}',
+        }
+
+        output_args = {
+            'format': 'flv',
+            'vcodec': 'libx264',
+            'video_bitrate': f'{self.bitrate}k',
+            'maxrate': f'{self.bitrate * 5 // 4}k',
+            'bufsize': f'{self.bitrate * 5 // 2}k',
+            'framerate': f'{self.stream_fps:g}',
+            'preset': 'veryfast',
+            'tune': 'zerolatency',
+            'g': '30',
+            'pix_fmt': 'yuv420p',
+        }
+
+        stream_url = self.output_url or f"{self.rtmp_url}{self.device_id}?key={self.stream_key}"
+
+        process = (
+            ffmpeg
+            .input('pipe:', **input_args)
+            .output(stream_url, **output_args)
+            .overwrite_output()
+            .global_args('-loglevel', 'error', '-progress', 'pipe:2', '-nostats')
+            .run_async(pipe_stdin=True, pipe_stderr=True)
+        )
+
+        self.process = process
+        self.progress = {}
+        self.progress_thread = threading.Thread(target=self._read_progress, args=(process,), name="stream-progress", daemon=True)
+        self.progress_thread.start()
+        self.writer = FrameWriter(process.stdin, self.queue_size)
+        self.writer.start()
+        self.next_frame_time = None
+
+    def _read_progress(self, process):
+        '''
+        Drain ffmpeg's stderr, keeping the latest -progress values and logging anything else as an error.
+        '''
+        for line in iter(process.stderr.readline, b''):
+            key, sep, value = line.decode(errors="replace").strip().partition('=')
+            if sep and ' ' not in key:
+                self.progress[key] = value
+            elif key:
+                self.logger.error(f"ffmpeg: {key}")
+
+    def encoder_speed(self) -> Optional[float]:
+        speed = self.progress.get('speed', '').rstrip('x')
+        try:
+            return float(speed)
+        except ValueError:
+            return None
+
+    async def _stop_encoder(self, flush_timeout: float = 5):
+        loop = asyncio.get_running_loop()
+        writer, self.writer = self.writer, None
+        process, self.process = self.process, None
+        if writer:
+            writer.halt()
+        if process:
+            await loop.run_in_executor(None, self._shutdown_process, process, writer, flush_timeout)
+        elif writer:
+            await loop.run_in_executor(None, writer.stop)
+        if self.progress_thread:
+            await loop.run_in_executor(None, self.progress_thread.join, 1)
+            self.progress_thread = None
+
+    def _shutdown_process(self, process, writer: Optional[FrameWriter], timeout: float):
+        '''
+        Runs off the event loop. ffmpeg gets timeout seconds to take the pending frames and exit once stdin
+        is closed. Closing stdin waits for the pipe lock, which a writer stuck in a write holds, so it runs
+        on its own thread; if ffmpeg has not exited by the deadline it is terminated and then killed,
+        which fails any blocked write with EPIPE and lets both threads finish.
+        '''
+        deadline = time.monotonic() + timeout
+        if writer:
+            writer.stop(timeout)
+        closer = threading.Thread(target=self._close_pipe, args=(process.stdin,), name="stream-close", daemon=True)
+        closer.start()
+        closer.join(max(deadline - time.monotonic(), 0))
+        try:
+            process.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            if timeout > 0:
+                self.logger.warning(f"ffmpeg did not exit within {timeout}s, terminating")
+            process.terminate()
+            try:
+                process.wait(2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        closer.join(2)
+        if writer and not writer.stop(2):
+            self.logger.error("Stream writer thread did not exit")
+
+    @staticmethod
+    def _close_pipe(pipe):
+        try:
+            pipe.close()
+        except (OSError, ValueError):
+            pass
+
+    async def _control_loop(self):
+        '''
+        Feed the controller one window of writer and encoder statistics per interval, restarting the
+        encoder with the new profile when it asks for a change. The old encoder is killed rather than drained, a congested
+        uplink is exactly when it would not flush, and its backlog is stale by then anyway.
+        '''
+        while self.stream_active and self.controller:
+            await asyncio.sleep(self.control_interval)
+            if not self.writer:
+                continue
+            health = StreamHealth(self.writer.written, self.writer.dropped, self.writer.latency, self.writer.queue_depth(), self.encoder_speed())
+            profile = self.controller.update(health)
+            if profile is None:
+                continue
+            self.switching = True
+            try:
+                await self._stop_encoder(flush_timeout=0)
+                self._apply_profile(profile)
+                self._start_encoder()
+            except Exception as e:
+                self.logger.error(f"Failed to switch stream profile: {e}")
+                self.stream_active = False
+            finally:
+                self.switching = False
+
     async def stop_stream(self):
         if not self.stream_active:
             self.logger.warning("No active stream to stop")
             return
 
         try:
-            if self.process:
-                self.process.stdin.close()
-                self.process.wait
-                self.process = None
+            if self.control_task:
+                self.control_task.cancel()
+                try:
+                    await self.control_task
+                except asyncio.CancelledError:
+                    pass
+                self.control_task = None
+            await self._stop_encoder()
             self.stream_active = False
             self.logger.info("Stream stopped successfully")
         except Exception as e:
             self.logger.error(f"Error stopping stream: {e}")
             raise
 
-    async def send_frame(self, frame):
-        if not self.stream_active or not self.process:
+    def due(self, now: Optional[float] = None) -> bool:
+        '''
+        True when the next frame would be sent at stream_fps, so callers can skip preparing frames that would be dropped.
+        '''
+        now = time.monotonic() if now is None else now
+        return self.next_frame_time is None or now >= self.next_frame_time
+
+    def _prepare(self, frame: np.ndarray, overlay: Optional[Callable[[np.ndarray], None]] = None) -> np.ndarray:
+        '''
+        Scale the frame to the output resolution and convert it to the pipe format, straight into a writer buffer.
+        overlay draws in place on the scaled BGR image, never on the caller's frame.
+        '''
+        width, height = self.output_resolution
+        code = PIPE_FORMATS[self.pix_fmt]
+        if code is None:
+            buffer = self.writer.acquire((height, width, 3))
+            if frame.shape[:2] == (height, width):
+                np.copyto(buffer, frame)
+            else:
+                cv2.resize(frame, (width, height), dst=buffer, interpolation=cv2.INTER_AREA)
+            if overlay:
+                overlay(buffer)
+            return buffer
+        if frame.shape[:2] != (height, width) or overlay:
+            if self.scaled is None or self.scaled.shape[:2] != (height, width):
+                self.scaled = np.empty((height, width, 3), dtype=np.uint8)
+            if frame.shape[:2] == (height, width):
+                np.copyto(self.scaled, frame)
+            else:
+                cv2.resize(frame, (width, height), dst=self.scaled, interpolation=cv2.INTER_AREA)
+            frame = self.scaled
+            if overlay:
+                overlay(frame)
+        buffer = self.writer.acquire((height * 3 // 2, width))
+        cv2.cvtColor(frame, code, dst=buffer)
+        return buffer
+
+    async def send_frame(self, frame, overlay: Optional[Callable[[np.ndarray], None]] = None):
+        '''
+        Downscale, convert and hand the frame to the writer thread at stream_fps without blocking,
+        frames in between are skipped and under backpressure the oldest queued frame is dropped.
+        overlay is only called for frames that are actually sent, at stream resolution.
+        '''
+        if self.switching:
+            self.skipped += 1
+            return
+        if not self.stream_active or not self.writer:
             self.logger.error("STREAM INACTIVE OR PROCESS IS NONE")
             return
 
-        try:
-            self.logger.debug("Writing frame to stdin") 
-            self.process.stdin.write(frame.tobytes())
-        except Exception as e:
-            self.logger.error(f"Error sending frame to stream: {e}")
+        if self.writer.error is not None:
+            error = self.writer.error
+            self.logger.error(f"Error sending frame to stream: {error}")
             await self.stop_stream()
-            raise
+            raise error
+        now = time.monotonic()
+        if not self.due(now):
+            self.skipped += 1
+            return
+        interval = 1 / self.stream_fps if self.stream_fps > 0 else 0
+        next_frame_time = (self.next_frame_time or now) + interval
+        self.next_frame_time = next_frame_time if next_frame_time > now - interval else now
+        self.writer.submit(self._prepare(frame, overlay))
 
-    async def update_config(self):
-        new_output_url = self.config_manager.get("rtmp_url", "")
-        new_stream_key = self.config_manager.get("stream_key", "")
-        new_resolution = tuple(self.config_manager.get("stream_resolution", (640, 480)))
-        new_frame_rate = self.config_manager.get(PayloadKeys.FPS, 30)
-
-        if (new_output_url != self.output_url or 
-            new_stream_key != self.stream_key or 
-            new_resolution != self.output_resolution or 
-            new_frame_rate != self.frame_rate):
-            
-            self.logger.info("Stream configuration changed. Reinitializing stream.")
+    def get_stats(self) -> Dict[str, Any]:
+        if not self.writer:
+            return {}
+        stats = {**self.writer.get_stats(), "skipped": self.skipped, "speed": self.encoder_speed()}
+        if self.controller:
+            stats.update(self.controller.get_stats())
+        return stats
+
+    def _settings(self) -> Tuple:
+        return (self.input_resolution, self.output_resolution, self.frame_rate, self.rtmp_url, self.stream_key, self.queue_size,
+                self.stream_fps, self.pix_fmt, self.bitrate, self.output_url, self.controller is not None)
+
+    async def update_config(self) -> bool:
+        '''
+        Re-read the stream settings and restart ffmpeg only when one of them changed, returns True on restart.
+        '''
+        settings = self._settings()
+        await self.initialize()
+        if settings == self._settings():
+            return False
+        if self.stream_active:
+            self.logger.info("Stream configuration changed. Restarting stream.")
             await self.stop_stream()
-            self.output_url = new_output_url
-            self.stream_key = new_stream_key
-            self.output_resolution = new_resolution
-            self.frame_rate = new_frame_rate
             await self.start_stream()
+        return True
 
     async def cleanup(self):
         await self.stop_stream()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import threading
+import time
+import logging
+import numpy as np
+from collections import deque
+from typing import Any, BinaryIO, Deque, Dict, List, Optional
+
+class FrameWriter:
+    '''
+    Writes frames to a pipe from a dedicated thread so a slow encoder or uplink never blocks the
+    event loop. Frames are copied once into a small pool of preallocated buffers, because capture
+    buffers are reused, and written straight from those buffers without a tobytes() copy.
+    When the queue is full the oldest pending frame is dropped.
+    '''
+    def __init__(self, pipe: BinaryIO, max_queue: int = 2, name: str = "stream-writer"):
+        self.logger = logging.getLogger("app")
+        self.pipe = pipe
+        self.max_queue = max(int(max_queue), 1)
+        self.name = name
+        self.queue: Deque[np.ndarray] = deque()
+        self.pool: List[np.ndarray] = []
+        self.condition = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+        self.running: bool = False
+        self.error: Optional[Exception] = None
+        self.written: int = 0
+        self.dropped: int = 0
+        self.latency: float = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def acquire(self, shape, dtype=np.uint8) -> np.ndarray:
+        '''
+        A free buffer of the given shape to fill before submit(), allocated on first use.
+        '''
+        with self.condition:
+            while self.pool:
+                buffer = self.pool.pop()
+                if buffer.shape == tuple(shape) and buffer.dtype == dtype:
+                    return buffer
+        return np.empty(shape, dtype=dtype)
+
+    def submit(self, buffer: np.ndarray) -> bool:
+        '''
+        Queue a filled buffer for writing, returns False when the writer has stopped.
+        '''
+        with self.condition:
+            if not self.running:
+                return False
+            if len(self.queue) >= self.max_queue:
+                self.pool.append(self.queue.popleft())
+                self.dropped += 1
+            self.queue.append(buffer)
+            self.condition.notify()
+        return True
+
+    def write(self, frame: np.ndarray) -> bool:
+        buffer = self.acquire(frame.shape, frame.dtype)
+        np.copyto(buffer, frame)
+        return self.submit(buffer)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                buffer = self.queue.popleft()
+            start = time.perf_counter()
+            try:
+                self.pipe.write(memoryview(buffer).cast("B"))
+            except Exception as e:
+                if not self.running:
+                    return
+                self.error = e
+                self.running = False
+                self.logger.error(f"Error writing frame to stream: {e}")
+                return
+            elapsed = time.perf_counter() - start
+            self.latency = elapsed if self.latency == 0 else 0.9 * self.latency + 0.1 * elapsed
+            with self.condition:
+                self.written += 1
+                self.pool.append(buffer)
+
+    def halt(self):
+        '''
+        Ask the thread to stop without waiting. A write already blocked in the pipe only returns once the
+        reader drains it or goes away, which is up to the owner of the pipe.
+        '''
+        with self.condition:
+            self.running = False
+            self.queue.clear()
+            self.condition.notify_all()
+
+    def stop(self, timeout: float = 2) -> bool:
+        '''
+        Halt and join the thread for up to timeout seconds, returns False while it is still stuck in a write.
+        '''
+        self.halt()
+        if self.thread is None:
+            return True
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def queue_depth(self) -> int:
+        return len(self.queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "queue": len(self.queue),
+            "write_latency": round(self.latency, 4),
+        }
@@ -0,0 +1,84 @@
+import numpy as np
+from typing import Dict, Tuple
+
+class TrackStore:
+    '''
+    Fixed-capacity per-track state for the counter, held in preallocated arrays indexed by slot:
+    last-seen frame, last center, counted flag and polygon-zone membership bits.
+    Tracks unseen for more than ttl frames are evicted, and when every slot is taken the least
+    recently seen track makes room, so memory stays flat however many tracks a device sees.
+    '''
+    def __init__(self, capacity: int = 1024, ttl: int = 900):
+        self.capacity = max(int(capacity), 64)
+        self.ttl = int(ttl)
+        self.ids = np.full(self.capacity, -1, dtype=np.int64)
+        self.last_seen = np.zeros(self.capacity, dtype=np.int64)
+        self.positions = np.zeros((self.capacity, 2), dtype=np.float32)
+        self.counted = np.zeros(self.capacity, dtype=bool)
+        self.inside = np.zeros(self.capacity, dtype=np.uint64)
+        self.slots: Dict[int, int] = {}
+        self.frame = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def reset(self):
+        self.ids[:] = -1
+        self.counted[:] = False
+        self.inside[:] = 0
+        self.slots.clear()
+        self.frame = 0
+
+    def _free(self, slots: np.ndarray):
+        for slot in slots.tolist():
+            del self.slots[int(self.ids[slot])]
+        self.ids[slots] = -1
+        self.counted[slots] = False
+        self.inside[slots] = 0
+        self.evicted += len(slots)
+
+    def expire(self):
+        expired = np.flatnonzero((self.ids >= 0) & (self.frame - self.last_seen > self.ttl))
+        if len(expired):
+            self._free(expired)
+
+    def observe(self, track_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        Advance the frame clock and return the slots of track_ids, allocating slots for new tracks,
+        together with a mask of the tracks that were already known. last_seen is updated, positions
+        are left for the caller to read before writing the new centers.
+        '''
+        self.frame += 1
+        if self.frame % 32 == 0:
+            self.expire()
+        slots = np.fromiter((self.slots.get(track_id, -1) for track_id in track_ids.tolist()), dtype=np.int64, count=len(track_ids))
+        known = slots >= 0
+        new = np.flatnonzero(~known)
+        if len(new):
+            free = np.flatnonzero(self.ids < 0)
+            if len(free) < len(new):
+                self.expire()
+                free = np.flatnonzero(self.ids < 0)
+            if len(free) < len(new):
+                occupied = np.flatnonzero(self.ids >= 0)
+                occupied = occupied[~np.isin(occupied, slots[known])]
+                oldest = occupied[np.argsort(self.last_seen[occupied], kind="stable")[:len(new) - len(free)]]
+                self._free(oldest)
+                free = np.flatnonzero(self.ids < 0)
+            free = free[:len(new)]
+            slots[new] = free
+            self.ids[free] = track_ids[new]
+            self.counted[free] = False
+            self.inside[free] = 0
+            for slot, track_id in zip(free.tolist(), track_ids[new].tolist()):
+                self.slots[track_id] = slot
+        self.last_seen[slots] = self.frame
+        return slots, known
+
+    def get_stats(self):
+        return {
+            "tracks": len(self.slots),
+            "capacity": self.capacity,
+            "evicted": self.evicted,
+        }
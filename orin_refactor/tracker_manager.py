@@ -1,26 +1,75 @@
 import asyncio
-import cv2
 import logging
-from typing import Dict, Any, Optional,AsyncIterator,Tuple,List
-from ultralytics import YOLO
+from typing import Dict, Any, Optional,AsyncIterator,Tuple,List,Callable,Awaitable,Union
 from config_manager import ConfigManager
 from capture_manager import CaptureManager
 from object_counter import ObjectCounter
 from stream_manager import StreamManager
+from preview_server import preview_server
+from clip_recorder import ClipRecorder
+from overlay import OverlayRenderer
+from frame import Frame
+from motion_detector import MotionDetector
+from motion_calibrator import MotionCalibrator
+from replay_source import ReplayPacing
+from inference_worker import InferenceWorker, DropPolicy
+from inference_scheduler import InferenceScheduler, TrackPredictor, Tracks
+from roi_inference import RoiInference, RoiMode
+from inference_backend import InferenceBackend, DetectionTracker
+from model_registry import model_registry
+from multi_tracker import MultiObjectTracker
 import numpy as np
-from scipy import stats
 from socket_types import *
 import time
 import os
 
 class TrackerManager:
+    RELOAD_KEYS = {
+        ConfigKeys.weights, ConfigKeys.inference_backend, ConfigKeys.inference_device, ConfigKeys.inference_roi,
+        ConfigKeys.inference_roi_margin, ConfigKeys.inference_tile_size, ConfigKeys.inference_tile_overlap,
+        ConfigKeys.inference_queue_size, ConfigKeys.inference_drop_policy,
+    }
+    CAPTURE_KEYS = {
+        ConfigKeys.source, ConfigKeys.resolution, ConfigKeys.fps, ConfigKeys.threaded_capture, ConfigKeys.capture_buffers,
+        ConfigKeys.replay_pacing, ConfigKeys.replay_fps, ConfigKeys.replay_loop, ConfigKeys.replay_epoch,
+    }
+    STREAM_KEYS = {
+        ConfigKeys.rtmp_url, ConfigKeys.stream_key, ConfigKeys.stream_resolution, ConfigKeys.resolution, ConfigKeys.fps,
+        ConfigKeys.stream_queue_size, ConfigKeys.stream_fps, ConfigKeys.stream_pix_fmt, ConfigKeys.stream_bitrate,
+        ConfigKeys.stream_output, ConfigKeys.adaptive_stream, ConfigKeys.stream_profiles, ConfigKeys.stream_adapt_interval,
+        ConfigKeys.stream_downgrade_after, ConfigKeys.stream_upgrade_after,
+    }
+    COUNTER_KEYS = {
+        ConfigKeys.counting_region_top, ConfigKeys.counting_region_bottom, ConfigKeys.upload_threshold,
+        ConfigKeys.miss_threshold, ConfigKeys.counter_miss_condition, ConfigKeys.resolution, ConfigKeys.counting_zones,
+        ConfigKeys.track_store_capacity, ConfigKeys.track_ttl,
+    }
+    MOTION_KEYS = {
+        ConfigKeys.motion_width, ConfigKeys.motion_learning_rate, ConfigKeys.motion_pixel_threshold, ConfigKeys.motion_regions,
+        ConfigKeys.motion_roi_margin, ConfigKeys.counting_region_top, ConfigKeys.counting_region_bottom,
+    }
+    TRACKER_KEYS = {
+        ConfigKeys.tracker, ConfigKeys.track_high_thresh, ConfigKeys.track_low_thresh, ConfigKeys.new_track_thresh,
+        ConfigKeys.track_match_thresh, ConfigKeys.track_buffer,
+    }
+    SCHEDULER_KEYS = {
+        ConfigKeys.adaptive_inference, ConfigKeys.inference_min_fps, ConfigKeys.inference_max_fps,
+        ConfigKeys.inference_max_displacement, ConfigKeys.inference_duty_cycle,
+    }
+    CLIP_KEYS = {
+        ConfigKeys.save_videos, ConfigKeys.save_dir, ConfigKeys.clip_pre_seconds, ConfigKeys.clip_post_seconds, ConfigKeys.clip_fps,
+        ConfigKeys.clip_quality, ConfigKeys.clip_width, ConfigKeys.clip_buffer_mb, ConfigKeys.clip_max_seconds, ConfigKeys.clip_codec,
+    }
+
     def __init__(self, config_manager: ConfigManager,mode):
         self.config_manager = config_manager
         self.capture_manager = CaptureManager(self.config_manager)
         self.stream_manager = None
         self.object_counter = ObjectCounter(config_manager)
         self.logger = logging.getLogger("app")
-        self.model = None
+        self.backend: Optional[InferenceBackend] = None
+        self.detection_tracker: Union[MultiObjectTracker, DetectionTracker] = DetectionTracker()
+        self.native_tracking: bool = False
         self.mode: Mode = mode
         self.motion_detected: bool = False
         self.tracking: bool = False
@@ -28,16 +77,70 @@ class TrackerManager:
         self.no_motion_frames = 0
         self.stop_signal = asyncio.Event()
         self.stream = False
-        self.prev_frames: list[np.ndarray] = []
+        self.motion_detector = MotionDetector()
+        self.motion_score: float = 0.0
+        self.calibrator: Optional[MotionCalibrator] = None
+        self.inference_worker: Optional[InferenceWorker] = None
+        self.scheduler = InferenceScheduler()
+        self.track_predictor = TrackPredictor()
+        self.roi_inference: Optional[RoiInference] = None
+        self.clip_recorder: Optional[ClipRecorder] = None
+        self.overlay = OverlayRenderer()
+        self.clip_on_motion: bool = True
         self.device_id = os.getenv("DEVICE_ID")
+        self.count_latency: float = 0.0
+        self.frame_latency: float = 0.0
 
     async def initialize(self):
-        await self.object_counter.init_config()
         if self.mode != Mode.STREAM_ONLY:
-            self.model = YOLO(f"weights/{self.config_manager.get(ConfigKeys.weights, 'best.pt')}")
-            self.names = self.model.names
+            self.backend = await model_registry.acquire(
+                f"weights/{self.config_manager.get(ConfigKeys.weights, 'best.pt')}",
+                self.config_manager.get(ConfigKeys.inference_backend, "auto"),
+                self.config_manager.get(ConfigKeys.inference_device, "auto"),
+                int(self.config_manager.get(ConfigKeys.inference_warmup_runs, 3)),
+                self.config_manager.get(PayloadKeys.RESOLUTION, (640, 480)),
+            )
+            self.names = self.backend.names
             await self.config_manager.update({ConfigKeys.names:self.names})
+        await self.object_counter.init_config()
         self.logger.info(f"Tracker Mode is {self.mode}")
+        self._load_settings()
+        self._configure_tracker()
+        self._configure_motion_detector()
+
+        roi_mode = self.config_manager.get(ConfigKeys.inference_roi, RoiMode.FULL)
+        if roi_mode in (RoiMode.CROP, RoiMode.TILED):
+            self.roi_inference = RoiInference(
+                roi_mode,
+                float(self.config_manager.get(ConfigKeys.inference_roi_margin, 10)),
+                int(self.config_manager.get(ConfigKeys.inference_tile_size, 640)),
+                float(self.config_manager.get(ConfigKeys.inference_tile_overlap, .2)),
+            )
+            self.roi_inference.set_band(
+                float(self.config_manager.get(ConfigKeys.counting_region_top, 75)),
+                float(self.config_manager.get(ConfigKeys.counting_region_bottom, 25)),
+            )
+
+        if self.backend is not None:
+            self.inference_worker = InferenceWorker(
+                self._infer,
+                int(self.config_manager.get(ConfigKeys.inference_queue_size, 1)),
+                self.config_manager.get(ConfigKeys.inference_drop_policy, DropPolicy.DROP_OLDEST),
+            )
+            self.inference_worker.start()
+
+        self._configure_scheduler()
+        await self._configure_clip_recorder()
+        self.track_predictor.reset()
+        
+        if self.mode == Mode.STREAM_ONLY:
+            self.stream_manager = StreamManager(self.config_manager)
+            await self.initialiaze_stream()
+        
+        await self.capture_manager.initialize()
+        self.logger.info(f"Initialized TrackerManager with mode: {self.mode}")
+
+    def _load_settings(self):
         self.motion_iou = float(self.config_manager.get(ConfigKeys.motion_iou,.3))
         self.motion_interval = self.config_manager.get(ConfigKeys.motion_interval,.8)
         self.calibration_length = self.config_manager.get(ConfigKeys.calibration_length,100)
@@ -46,19 +149,128 @@ class TrackerManager:
         self.max_no_motion_frames = self.config_manager.get(ConfigKeys.max_no_motion_frames, 20)
         self.show_bboxes = self.config_manager.get(ConfigKeys.show_bboxes,False)
         self.upload_interval = int(self.config_manager.get(ConfigKeys.upload_interval,200))
-        
-        if self.mode == Mode.STREAM_ONLY:
-            self.stream_manager = StreamManager(self.config_manager)
-            await self.initialiaze_stream()
-        
-        await self.capture_manager.initialize()
-        self.logger.info(f"Initialized TrackerManager with mode: {self.mode}")
 
-    async def update_config(self): 
-        await self.object_counter.init_config()
-        if self.stream_manager:
+    def _configure_tracker(self):
+        '''
+        The native tracker associates detections from any backend on the event loop, the ultralytics
+        tracker keeps its state inside the model and runs with inference.
+        '''
+        self.native_tracking = self.config_manager.get(ConfigKeys.tracker, "ultralytics") == "native"
+        if self.native_tracking:
+            self.detection_tracker = MultiObjectTracker(
+                float(self.config_manager.get(ConfigKeys.track_high_thresh, .25)),
+                float(self.config_manager.get(ConfigKeys.track_low_thresh, .1)),
+                float(self.config_manager.get(ConfigKeys.new_track_thresh, .25)),
+                float(self.config_manager.get(ConfigKeys.track_match_thresh, .8)),
+                int(self.config_manager.get(ConfigKeys.track_buffer, 30)),
+            )
+        else:
+            self.detection_tracker = DetectionTracker()
+        if self.backend is not None:
+            self.backend.reset()
+
+    def _configure_scheduler(self):
+        self.scheduler = InferenceScheduler(
+            bool(self.config_manager.get(ConfigKeys.adaptive_inference, False)),
+            float(self.config_manager.get(ConfigKeys.inference_min_fps, 2)),
+            float(self.config_manager.get(ConfigKeys.inference_max_fps, 0)),
+            float(self.config_manager.get(ConfigKeys.inference_max_displacement, 40)),
+            float(self.config_manager.get(ConfigKeys.inference_duty_cycle, 1.0)),
+        )
+
+    def _configure_motion_detector(self):
+        self._apply_motion_settings(self.motion_detector)
+        self.motion_detector.reset()
+
+    def _apply_motion_settings(self, detector: MotionDetector):
+        detector.configure(
+            int(self.config_manager.get(ConfigKeys.motion_width, 160)),
+            float(self.config_manager.get(ConfigKeys.motion_learning_rate, .05)),
+            int(self.config_manager.get(ConfigKeys.motion_pixel_threshold, 15)),
+        )
+        detector.set_regions(self._motion_regions())
+
+    async def _close_clip_recorder(self):
+        '''
+        Detach the recorder before closing it, so frames arriving meanwhile are not handed to a closing pool.
+        '''
+        recorder, self.clip_recorder = self.clip_recorder, None
+        if recorder:
+            await asyncio.get_running_loop().run_in_executor(None, recorder.close)
+
+    async def _configure_clip_recorder(self):
+        await self._close_clip_recorder()
+        self.clip_on_motion = self.config_manager.get(ConfigKeys.clip_on_motion, True)
+        if not self.config_manager.get(ConfigKeys.save_videos, False):
+            return
+        self.clip_recorder = ClipRecorder(
+            self.config_manager.get(ConfigKeys.save_dir, "output"),
+            float(self.config_manager.get(ConfigKeys.clip_pre_seconds, 10)),
+            float(self.config_manager.get(ConfigKeys.clip_post_seconds, 10)),
+            float(self.config_manager.get(ConfigKeys.clip_fps, 5)),
+            int(self.config_manager.get(ConfigKeys.clip_quality, 70)),
+            int(self.config_manager.get(ConfigKeys.clip_width, 640)),
+            int(float(self.config_manager.get(ConfigKeys.clip_buffer_mb, 64)) * 1024 * 1024),
+            float(self.config_manager.get(ConfigKeys.clip_max_seconds, 120)),
+            self.config_manager.get(ConfigKeys.clip_codec, "mp4v"),
+        )
+
+    def _record(self, frame: Frame):
+        if self.clip_recorder:
+            self.clip_recorder.add(frame.image, frame.wall_time)
+
+    def _trigger_clip(self, frame: Frame, reason: str):
+        if self.clip_recorder:
+            self.clip_recorder.trigger(frame.wall_time, reason)
+
+    def _motion_regions(self) -> List[Tuple[float, float, float, float]]:
+        '''
+        Motion regions in percent of the frame, defaults to the counting band plus motion_roi_margin.
+        '''
+        regions = self.config_manager.get(ConfigKeys.motion_regions, None)
+        if not regions:
+            margin = float(self.config_manager.get(ConfigKeys.motion_roi_margin, 10))
+            top = float(self.config_manager.get(ConfigKeys.counting_region_top, 75))
+            bottom = float(self.config_manager.get(ConfigKeys.counting_region_bottom, 25))
+            regions = [[0, min(top, bottom) - margin, 100, max(top, bottom) + margin]]
+        return [tuple(value / 100 for value in region) for region in regions]
+
+    async def apply_config(self, changed: Dict[str, Any]) -> bool:
+        '''
+        Apply changed config keys to the running tracker in place. Capture and stream are restarted only
+        when their own settings change, returns False when the change needs a full tracker rebuild.
+        '''
+        keys = set(changed)
+        if keys & self.RELOAD_KEYS:
+            return False
+        self._load_settings()
+        if keys & self.COUNTER_KEYS:
+            await self.object_counter.configure()
+            if self.roi_inference:
+                self.roi_inference.set_band(
+                    float(self.config_manager.get(ConfigKeys.counting_region_top, 75)),
+                    float(self.config_manager.get(ConfigKeys.counting_region_bottom, 25)),
+                )
+        if keys & self.MOTION_KEYS:
+            self._configure_motion_detector()
+        if keys & self.SCHEDULER_KEYS:
+            self._configure_scheduler()
+        if keys & (self.CLIP_KEYS | {ConfigKeys.clip_on_motion}):
+            await self._configure_clip_recorder()
+        if keys & self.TRACKER_KEYS:
+            self._configure_tracker()
+            self.track_predictor.reset()
+        if keys & self.CAPTURE_KEYS:
+            await self.capture_manager.restart()
+            self.motion_detector.reset()
+            self.track_predictor.reset()
+            self.detection_tracker.reset()
+            if self.backend is not None:
+                self.backend.reset()
+        if self.stream_manager and keys & self.STREAM_KEYS:
             await self.stream_manager.update_config()
-        self.logger.info(f"Updated TrackerManager configuration")
+        self.logger.info(f"Applied configuration changes in place: {sorted(keys)}")
+        return True
 
     async def stop_stream(self):
         try:
@@ -85,12 +297,15 @@ class TrackerManager:
             self.stream = False
             self.stream_manager = None
             
-    async def run(self) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
+    async def run(self) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
         self.logger.info(f"Starting tracking in mode: {self.mode}")
         
         while not self.stop_signal.is_set():
+            if self.capture_manager.is_exhausted():
+                self.logger.info("Capture source exhausted")
+                break
             if self.mode == Mode.STREAM_ONLY:
-                if not self.stream or self.stream_manager is None or not self.stream_manager.stream_active:
+                if not self._streaming() and not preview_server.enabled:
                     break
                 async for item in self._stream_only_loop():
                     yield item
@@ -114,11 +329,15 @@ class TrackerManager:
 
         self.logger.info("Tracking stopped")
 
-    async def _stream_only_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
+    async def _stream_only_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
         async for frame in self.capture_manager.get_frame_generator():
             if self.stop_signal.is_set():
                 break
-            await self.stream_manager.send_frame(frame)
+            self._feed_calibration(frame)
+            self._record(frame)
+            if not self._streaming() and not preview_server.enabled:
+                break
+            await self._handle_streaming(frame.image)
             yield None, None  
 
     async def _motion_data_collection(self):
@@ -129,14 +348,18 @@ class TrackerManager:
         async for frame in self.capture_manager.get_frame_generator():
             if self.stop_signal.is_set():
                 break
+            self._feed_calibration(frame)
+            self._record(frame)
             current_time = time.time()
             if current_time - last_motion_check >= self.motion_interval:
-                motion_detected = await self._check_motion(frame)
+                motion_detected = await self._check_motion(frame.image)
                 last_motion_check = current_time
 
                 if motion_detected:
                     self.motion_hits += 1
                     if self.motion_hits >= self.motion_hit_count:
+                        if not self.tracking and self.clip_on_motion:
+                            self._trigger_clip(frame, "motion")
                         self.motion_detected = True
                         self.tracking = True
                         self.motion_hits = 0
@@ -156,24 +379,24 @@ class TrackerManager:
             else:
                 self.motion_detected = False
                 
-            if self.stream and self.stream_manager.stream_active:
-                 await self.stream_manager.send_frame(frame)
+            await self._handle_streaming(frame.image)
                     
-    async def _collect_data(self) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
+    async def _collect_data(self) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
         prev = time.time()
         async for frame in self.capture_manager.get_frame_generator():
             if self.stop_signal.is_set():
                 break
+            self._feed_calibration(frame)
+            self._record(frame)
             curr = time.time()
             if curr - prev > self.upload_interval:
                 self.logger.info("Sending data from tracking loop")
                 prev = curr
                 yield {"plastic_bottle": 0}, frame
                 
-            if self.stream and self.stream_manager and self.stream_manager.stream_active:
-                await self.stream_manager.send_frame(frame)
+            await self._handle_streaming(frame.image)
 
-    async def _motion_tracking_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
+    async def _motion_tracking_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
         last_motion_check = 0
         self.motion_hits = 0
         self.tracking = False
@@ -181,15 +404,19 @@ class TrackerManager:
         async for frame in self.capture_manager.get_frame_generator():
             if self.stop_signal.is_set():
                 break
+            self._feed_calibration(frame)
+            self._record(frame)
 
             current_time = time.time()
             if current_time - last_motion_check >= self.motion_interval:
-                motion_detected = await self._check_motion(frame)
+                motion_detected = await self._check_motion(frame.image)
                 last_motion_check = current_time
 
                 if motion_detected:
                     self.motion_hits += 1
                     if self.motion_hits >= self.motion_hit_count:
+                        if not self.tracking and self.clip_on_motion:
+                            self._trigger_clip(frame, "motion")
                         self.motion_detected = True
                         self.tracking = True
                         self.motion_hits = 0
@@ -208,64 +435,104 @@ class TrackerManager:
                     yield tracking_data, tracked_frame
             else:
                 self.motion_detected = False
-                if self.stream and self.stream_manager.stream_active:
-                    await self.stream_manager.send_frame(frame)
+                await self._handle_streaming(frame.image)
+
+    def _streaming(self) -> bool:
+        return bool(self.stream and self.stream_manager and self.stream_manager.stream_active)
 
-    async def _handle_streaming(self, frame: np.ndarray, results: Any) -> None:
-        if self.stream and self.stream_manager.stream_active:
-            if self.show_bboxes and results:
-                frame = self.draw_bboxes(frame, results[0])
+    async def _handle_streaming(self, frame: np.ndarray, tracks: Optional[Tracks] = None) -> None:
+        streaming = self._streaming()
+        preview = preview_server.wants_frame()
+        if not streaming and not preview:
+            return
+        overlay = self._overlay(tracks) if self.show_bboxes and tracks is not None else None
+        if preview:
+            preview_server.publish(frame, overlay)
+        if streaming:
             try:
-                await self.stream_manager.send_frame(frame)
+                await self.stream_manager.send_frame(frame, overlay)
             except Exception as e:
                 self.logger.error(e)
                 self.stream = False
                 self.stream_manager = None
                 
-    async def _manual_tracking_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
+    async def _manual_tracking_loop(self) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
         self.tracking = True
+        last_motion_check = 0
         async for frame in self.capture_manager.get_frame_generator():
             if self.stop_signal.is_set():
                 break
+            self._feed_calibration(frame)
+            self._record(frame)
+            if self.scheduler.enabled and time.time() - last_motion_check >= self.motion_interval:
+                await self._check_motion(frame.image)
+                last_motion_check = time.time()
             async for tracking_data, tracked_frame in self._track_objects(frame):
                 yield tracking_data, tracked_frame
 
-    async def _track_objects(self, frame) -> AsyncIterator[Tuple[Dict[str, Any], np.ndarray]]:
-        results = await self.process_frame(frame)
-        if results and len(results) > 0:
-            tracking_data = await self.process_results(results[0], frame)
+    async def _track_objects(self, frame: Frame) -> AsyncIterator[Tuple[Dict[str, Any], Frame]]:
+        self.scheduler.motion_active = self.motion_score > self.motion_iou
+        if self.scheduler.should_infer(frame.capture_time):
+            output = await self.process_frame(frame.image)
+            if self.native_tracking:
+                tracks = self.detection_tracker.update(output[0], frame.image) if output else None
+            else:
+                tracks = output[0] if output else None
+            self.track_predictor.update(tracks, frame.capture_time)
+            self.scheduler.record(frame.capture_time, self.inference_worker.latency, self.track_predictor.max_speed())
+        else:
+            tracks = self.track_predictor.predict(frame.capture_time)
+        self.frame_latency = frame.age()
+        if tracks is not None:
+            tracking_data = await self.process_results(tracks, frame.wall_time)
             if tracking_data:
+                self.count_latency = frame.age()
+                self._trigger_clip(frame, "count")
                 yield tracking_data, frame
         
-        await self._handle_streaming(frame, results)
+        await self._handle_streaming(frame.image, tracks)
                
     async def process_frame(self, frame):
         try:
-            results = self.model.track(frame, conf=self.conf_threshold, show=False, persist=True, save=False, verbose=False, device=0)
+            results = await self.inference_worker.submit(frame)
             return results 
         except Exception as e:
             self.logger.error(f"Error processing frame: {e}")
             return None
-        
-    async def process_results(self, results, frame) -> Optional[Dict[str, Any]]:
+
+    def _infer(self, frame: np.ndarray) -> Tuple[Any, Any]:
+        '''
+        Runs on the inference worker thread. With native tracking it returns the full-frame detections
+        for association on the event loop, otherwise full-frame tracks, paired with the backend's raw
+        results where it returns them.
+        '''
+        if self.native_tracking:
+            if self.roi_inference:
+                return self.roi_inference.detect(self.backend, frame, self.conf_threshold), None
+            return self.backend.detect([frame], self.conf_threshold)[0], None
+        if self.roi_inference:
+            return self.roi_inference.run(self.backend, self.detection_tracker, frame, self.conf_threshold), None
+        if self.backend.can_track:
+            return self.backend.track(frame, self.conf_threshold)
+        detections = self.backend.detect([frame], self.conf_threshold)[0]
+        return self.detection_tracker.update(detections, frame), None
+
+    async def process_results(self, tracks: Tracks, timestamp: Optional[float] = None) -> Optional[Dict[str, Any]]:
         try:
-            if results.boxes.id is not None:
-                boxes = results.boxes.xyxy.cpu().numpy()
-                track_ids = results.boxes.id.int().cpu().numpy().tolist()
-                classes = results.boxes.cls.cpu().numpy().tolist()
-                
-                await self.object_counter.start_counting(boxes, track_ids, classes)
+            boxes, track_ids, classes = tracks
+            self.object_counter.start_counting(boxes, track_ids, classes, timestamp)
+            
+            if self.object_counter.should_upload():
+                counts = self.object_counter.get_counts()
+                self.object_counter.reset_upload_flag()
                 
-                if self.object_counter.should_upload():
-                    counts = self.object_counter.get_counts()
-                    self.object_counter.reset_upload_flag()
-                    
-                    return {
-                        PayloadKeys.COUNT_DATA: counts,
-                        PayloadKeys.DATA: {
-                            "total_collected": self.object_counter.collected_total
-                        }
+                return {
+                    PayloadKeys.COUNT_DATA: counts,
+                    PayloadKeys.ZONE_COUNTS: self.object_counter.get_zone_counts(),
+                    PayloadKeys.DATA: {
+                        "total_collected": self.object_counter.collected_total
                     }
+                }
             
             return None
         except Exception as e:
@@ -273,103 +540,110 @@ class TrackerManager:
             return None
         
     async def _check_motion(self, frame: np.ndarray) -> bool:
-        motion_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        motion_frame = cv2.GaussianBlur(motion_frame, (21, 21), 0)
-                
-        self.prev_frames.append(motion_frame)
-        if len(self.prev_frames) > 3:
-            self.prev_frames.pop(0)
-
-        if len(self.prev_frames) == 3:
-            diff = cv2.countNonZero(self.diff_img(*self.prev_frames))
-            return (diff / motion_frame.size) > self.motion_iou
-
-        return False
-    
-    def draw_bboxes(self, frame, results):
-        if results and results.boxes.id is not None:
-            annotated_frame = results.plot()
-            cv2.line(annotated_frame, 
-                     (0, self.object_counter.counting_region_top), 
-                     (frame.shape[1], self.object_counter.counting_region_top), 
-                     (0, 255, 0), 2)
-            cv2.line(annotated_frame, 
-                     (0, self.object_counter.counting_region_bottom),
-                     (frame.shape[1], self.object_counter.counting_region_bottom), 
-                     (0, 255, 0), 2)
-            return annotated_frame
-        return frame
-    
-    def diff_img(self, t0: np.ndarray, t1: np.ndarray, t2: np.ndarray) -> np.ndarray:
-        d1 = cv2.absdiff(t2, t1)
-        d2 = cv2.absdiff(t1, t0)
-        return cv2.bitwise_and(d1, d2)
+        self.motion_score = self.motion_detector.update(frame)
+        return self.motion_score > self.motion_iou
     
+    def _overlay(self, tracks: Tracks) -> Callable[[np.ndarray], None]:
+        '''
+        Deferred drawing of the tracks and counting band, run by the stream and preview on the frames they send.
+        '''
+        boxes, track_ids, _ = tracks
+        counter = self.object_counter
+        self.overlay.set_band(counter.counting_region_top, counter.counting_region_bottom, counter.resolution)
+        return lambda image: self.overlay.draw(image, boxes, track_ids, counter.zones)
 
     def get_state(self) -> Dict[str, Any]:
         return {
             PayloadKeys.TRACKING: self.tracking,
             PayloadKeys.MODE: self.mode,
             PayloadKeys.MOTION_DETECTED: self.motion_detected,
+            PayloadKeys.MOTION_SCORE: round(self.motion_score, 4),
+            PayloadKeys.MOTION_SCORES: [round(score, 4) for score in self.motion_detector.scores],
             PayloadKeys.COUNT_DATA: self.object_counter.get_counts(),
+            PayloadKeys.ZONE_COUNTS: self.object_counter.get_zone_counts(),
             PayloadKeys.TRACKER_ALIVE:  not self.stop_signal.is_set(),
-            PayloadKeys.STREAM: self.stream_manager and self.stream_manager.stream_active
+            PayloadKeys.STREAM: self.stream_manager and self.stream_manager.stream_active,
+            PayloadKeys.STREAM_STATS: self.stream_manager.get_stats() if self.stream_manager else None,
+            PayloadKeys.PREVIEW_STATS: preview_server.get_stats(),
+            PayloadKeys.CLIPS: self.clip_recorder.get_stats() if self.clip_recorder else None,
+            PayloadKeys.FRAME_LATENCY: round(self.frame_latency, 4),
+            PayloadKeys.COUNT_LATENCY: round(self.count_latency, 4),
+            PayloadKeys.DROPPED_FRAMES: self.capture_manager.dropped_frames,
+            PayloadKeys.CALIBRATING: self.calibrator is not None,
+            PayloadKeys.INFERENCE: self.inference_worker.get_stats() if self.inference_worker else None,
+            PayloadKeys.BACKEND: self.backend.get_stats() if self.backend else None,
+            PayloadKeys.SCHEDULER: self.scheduler.get_stats(),
+            PayloadKeys.TRACKS: self.detection_tracker.get_stats() if self.native_tracking else None,
+            PayloadKeys.TRACK_STORE: self.object_counter.get_track_stats(),
         }
         
-    async def calibrate(self) -> float:
+    async def calibrate(self, progress_callback: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> float:
         '''
         Perform calibration to determine a suitable motion threshold.
+        While a mode is running, the active capture loop feeds the calibrator and tracking carries on.
+        Otherwise, or when calibration_source points at a recorded clip, frames come from a dedicated capture.
+        Raises when no threshold could be computed, so a failed run never replaces motion_iou.
         '''
-        diffs = []
-
+        feed_task = None
         try:
-            if self.capture_manager:
-                self.capture_manager = CaptureManager(self.config_manager)
-                await self.capture_manager.initialize()
-            
-            self.calibration_length = int(self.config_manager.get("calibration_length", 100))
-            self.motion_interval = float(self.config_manager.get("motion_interval", 2))
-
-            self.prev_frames = []
-            for _ in range(3):
-                async for frame in self.capture_manager.get_frame_generator():
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    blurred = cv2.GaussianBlur(gray, (21, 21), 0)
-                    self.prev_frames.append(blurred)
-                    break
+            self.calibration_length = int(self.config_manager.get(ConfigKeys.calibration_length, 100))
+            self.motion_interval = float(self.config_manager.get(ConfigKeys.motion_interval, 2))
+            percentile = float(self.config_manager.get(ConfigKeys.calibration_percentile, 95))
+            source = self.config_manager.get(ConfigKeys.calibration_source, None)
 
-            frame_count = 0
-            async for frame in self.capture_manager.get_frame_generator():
-                motion_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                motion_frame = cv2.GaussianBlur(motion_frame, (21, 21), 0)
+            detector = MotionDetector()
+            self._apply_motion_settings(detector)
+            self.calibrator = MotionCalibrator(detector, self.calibration_length, self.motion_interval, percentile)
 
-                diff = cv2.countNonZero(self.diff_img(*self.prev_frames))
-                diffs.append(diff / motion_frame.size) 
+            if source or self.mode == Mode.CALIBRATE or self.stop_signal.is_set():
+                feed_task = asyncio.create_task(self._calibration_capture_loop(source))
 
-                self.prev_frames = self.prev_frames[1:] + [motion_frame]
-
-                frame_count += 1
-                if frame_count >= self.calibration_length:
+            while not self.calibrator.done:
+                if feed_task is None and self.stop_signal.is_set():
+                    self.calibrator.finish()
                     break
+                try:
+                    await asyncio.wait_for(self.calibrator.updated.wait(), timeout=max(self.motion_interval, 1))
+                except asyncio.TimeoutError:
+                    continue
+                self.calibrator.updated.clear()
+                if progress_callback:
+                    await progress_callback(self.calibrator.get_progress())
 
-                await asyncio.sleep(self.motion_interval)
-
-            threshold = self.calculate_threshold(diffs)
-            self.logger.info(f"CALIBRATION COMPLETE, Motion Threshold is {threshold}")
+            threshold = self.calibrator.threshold()
+            self.logger.info(f"CALIBRATION COMPLETE, Motion Threshold is {threshold} ({self.calibrator.get_progress()})")
             return threshold
 
         except Exception as e:
             self.logger.error(f"Error calibrating motion: {e}")
-            return 0.1  
+            raise
+        finally:
+            if feed_task:
+                feed_task.cancel()
+                try:
+                    await feed_task
+                except asyncio.CancelledError:
+                    pass
+            self.calibrator = None
 
-    def calculate_threshold(self, diffs: List[float]) -> float:
-        '''
-        Calculate the motion threshold based on the collected differences.
-        '''
-        mean_diff = np.mean(diffs)
-        std_diff = np.std(diffs)
-        threshold = mean_diff + 2 * std_diff 
-        return min(max(threshold, 0.01), 0.99) 
+    async def _calibration_capture_loop(self, source: Optional[str] = None):
+        capture_manager = CaptureManager(self.config_manager)
+        try:
+            await capture_manager.initialize(source, ReplayPacing.MAX if source else None)
+            async for frame in capture_manager.get_frame_generator():
+                if self.calibrator is None or self.calibrator.done:
+                    break
+                self._feed_calibration(frame)
+        except Exception as e:
+            self.logger.error(f"Error reading calibration frames: {e}")
+        finally:
+            await capture_manager.cleanup()
+            if self.calibrator:
+                self.calibrator.finish()
+
+    def _feed_calibration(self, frame: Frame):
+        if self.calibrator is not None and not self.calibrator.done:
+            self.calibrator.observe(frame.image, frame.wall_time)
 
     async def create_status_message(self) -> Message:
         device_id = self.device_id
@@ -383,6 +657,12 @@ class TrackerManager:
                 await self.stream_manager.stop_stream()
             except:
                 pass
+        if self.inference_worker:
+            await self.inference_worker.stop()
+        await self._close_clip_recorder()
+        if self.backend is not None:
+            model_registry.release(self.backend)
+            self.backend = None
         await self.capture_manager.stop_capture()
         self.logger.info("Stopped TrackerManager")
 
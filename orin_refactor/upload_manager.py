@@ -1,20 +1,21 @@
 from config_manager import ConfigManager
 from datetime import datetime
-import aiohttp
 from aiohttp import FormData
 import logging
 import numpy as np
 import json
-import cv2
 import io
 import time
 import os
 from socket_types import ConfigKeys
+from http_client import http_client
+from image_encoder import ImageEncoder
 from configuration import config
 logger = logging.getLogger("app")
 class UploadManager:
     def __init__(self,config_manager:ConfigManager):
         self.config_manager = config_manager   
+        self.encoder = ImageEncoder()
         
     async def initialize(self):
         self.use_cloud_function = self.config_manager.get(ConfigKeys.use_cloud_function,True)
@@ -22,6 +23,12 @@ class UploadManager:
         self.upload_images = self.config_manager.get(ConfigKeys.enable_uploads,False)
         self.device_id = os.getenv("DEVICE_ID")
         self.server_upload_url = self.config_manager.get("server_upload_url",None)
+        self.encoder.configure(
+            self.config_manager.get(ConfigKeys.upload_format, "jpeg"),
+            int(self.config_manager.get(ConfigKeys.upload_quality, 85)),
+            self.config_manager.get(ConfigKeys.upload_resolution, None),
+            int(self.config_manager.get(ConfigKeys.upload_encode_workers, 1)),
+        )
 
         
     async def upload(self,image,data,timestamp):
@@ -43,23 +50,20 @@ class UploadManager:
             
     async def cloud_function_file_upload(self,file_name, data, timestamp,url)-> None | Exception:
         try:
-            files = {
-                "trash_wheel_id":  str(self.device_id),
-                "contents_data":  json.dumps(data),
-                "image_file": open(f"output/{file_name}", "rb"),
-                "timestamp": datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').isoformat()
-            }
-    
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url,data=files) as resp:
+            with open(f"output/{file_name}", "rb") as image_file:
+                files = {
+                    "trash_wheel_id":  str(self.device_id),
+                    "contents_data":  json.dumps(data),
+                    "image_file": image_file,
+                    "timestamp": datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').isoformat()
+                }
+                try:
+                    async with http_client.post(url, data=files) as resp:
                         if resp.status != 200:
                             logger.error(f"Error uploading data, {resp.status}")
-            except Exception as e:
-                logger.error(f"error cloud function file upload uploading:{e}")
-                raise e
-            finally:
-                await session.close()
+                except Exception as e:
+                    logger.error(f"error cloud function file upload uploading:{e}")
+                    raise e
         
         except Exception as e:
             logger.error(f"Error uploading data: {e}")
@@ -68,26 +72,23 @@ class UploadManager:
     async def cloud_function_upload(self, frame: np.ndarray, data, timestamp):
    
         try:
-            _, img_encoded = cv2.imencode('.png', frame)
-            img_bytes = img_encoded.tobytes()
+            image = await self.encoder.encode(frame)
             
             form_data = FormData()
             form_data.add_field('trash_wheel_id', str(self.device_id))
             form_data.add_field('contents_data', json.dumps(data))
             form_data.add_field('image_file', 
-                                io.BytesIO(img_bytes), 
-                                filename=f"{str(round(time.time()) * 1000)}.png",
-                                content_type='image/png')
+                                io.BytesIO(image.data), 
+                                filename=f"{str(round(time.time()) * 1000)}{image.extension}",
+                                content_type=image.content_type)
             form_data.add_field('timestamp', datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S').isoformat())
 
             try:
-                print(self.cloud_function_url)
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(self.cloud_function_url, data=form_data) as resp:
-                        if resp.status != 200:
-                            logger.error(f"Error uploading, resp {resp.status}")
-                        else:
-                            logger.info("Upload successful")
+                async with http_client.post(self.cloud_function_url, data=form_data) as resp:
+                    if resp.status != 200:
+                        logger.error(f"Error uploading, resp {resp.status}")
+                    else:
+                        logger.info("Upload successful")
             except Exception as e:
                 logger.error(f"Error uploading: {e}")
             
@@ -96,6 +97,9 @@ class UploadManager:
 
            
     
+    def get_stats(self):
+        return self.encoder.get_stats()
+
     async def server_upload_stored_data(self,image_path,data,timestamp):
         if self.server_upload_url is None:
             raise NotImplementedError
@@ -61,17 +61,22 @@ class WebSocketClient:
         self.connected = False
         self.logger.info("Disconnected from WebSocket server")
 
-    async def send_message(self, message: Message) -> None:
+    async def send_message(self, message: Message) -> bool:
+        '''
+        Returns True once the message was handed to the socket, False when sending failed.
+        '''
         if not self.connected:
             raise ConnectionError("Not connected to WebSocket server")
         try:
             await self.websocket.send(json.dumps(message.to_dict()))
+            return True
         except websockets.exceptions.ConnectionClosed:
             self.logger.error("WebSocket connection closed unexpectedly")
             self.connected = False
             await self.connect()
         except Exception as e:
             self.logger.error(f"error sending message {e}")
+        return False
 
     async def listen(self) -> AsyncGenerator[Dict[str, Any], None]:
         while True:
@@ -117,6 +122,15 @@ class WebSocketClient:
         )
         await self.send_message(message)
 
+    async def send_count_buckets(self, buckets: Dict[str, Any]) -> bool:
+        message = Message(
+            device_id=self.device_id,
+            topic=Topic.DEVICE_DATA,
+            action=Action.SET_VALUE,
+            payload=Payload(data={PayloadKeys.COUNT_BUCKETS: buckets})
+        )
+        return await self.send_message(message)
+
     async def send_error(self, error_message: str) -> None:
         message = Message(
             device_id=self.device_id,